@@ -1,8 +1,12 @@
 from fastapi import APIRouter
 from apis.routes.auth import router as auth_router
 from apis.routes.code_execution import router as code_execution_router
+from apis.routes.code_execution_jobs import router as code_execution_jobs_router
+from apis.routes.code_execution_sessions import router as code_execution_sessions_router
 
 router = APIRouter(prefix="/api/v1")
 
 router.include_router(auth_router, prefix="/auth")
-router.include_router(code_execution_router, prefix="/code-execution")
\ No newline at end of file
+router.include_router(code_execution_router, prefix="/code-execution")
+router.include_router(code_execution_jobs_router, prefix="/code-execution")
+router.include_router(code_execution_sessions_router, prefix="/code-execution")
\ No newline at end of file
@@ -1,11 +1,14 @@
 import jwt
+import hmac
 from typing import Generator, Optional
-from fastapi import Depends, Request
+from fastapi import Depends, HTTPException, Request, status
 from sqlmodel import Session, select
 from database.db import engine
 from database.models.user import User
 from core.config import settings
 from fastapi.security import OAuth2PasswordBearer
+from slowapi.util import get_remote_address
+from utils.code_execution.fair_scheduler import Principal, STAFF_LANE
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 SECRET_KEY = settings.SECRET_KEY
@@ -34,4 +37,35 @@ def get_current_user(request: Request, token: Optional[str] = Depends(oauth2_sch
         return None
         
     user = db.exec(select(User).where(User.id == user_id)).first()
-    return user
\ No newline at end of file
+    return user
+
+
+def get_staff_user(current_user: Optional[User] = Depends(get_current_user)) -> User:
+    """For endpoints exposing internal capacity and usage: staff and superusers only."""
+    if current_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if not (current_user.is_staff or current_user.is_superuser):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return current_user
+
+
+def require_metrics_access(request: Request, token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """/metrics: the configured METRICS_TOKEN (for Prometheus), else a staff user."""
+    if settings.METRICS_TOKEN and token and hmac.compare_digest(token, settings.METRICS_TOKEN):
+        return
+    get_staff_user(get_current_user(request, token, db))
+
+
+def get_execution_principal(request: Request, current_user: Optional[User] = Depends(get_current_user)) -> Principal:
+    """Who code executions are queued and charged as: the signed-in user, else the client IP."""
+    quota = settings.CODE_EXECUTION_USER_CPU_QUOTA or None
+    if current_user is None:
+        return Principal(
+            f"ip:{get_remote_address(request)}",
+            weight=settings.CODE_EXECUTION_ANONYMOUS_WEIGHT,
+            cpu_quota=quota,
+        )
+    if current_user.is_staff or current_user.is_superuser:
+        # Staff get their own lane ahead of the queue and no quota
+        return Principal(f"user:{current_user.id}", lane=STAFF_LANE)
+    return Principal(f"user:{current_user.id}", cpu_quota=quota)
@@ -1,39 +1,160 @@
-from fastapi import APIRouter, HTTPException, Request
+import logging
+import json
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from schemas.code_execution import (
     CodeExecutionRequest,
     CodeExecutionResponse,
-    SupportedLanguagesResponse
+    BatchExecutionRequest,
+    BatchExecutionResponse,
+    SupportedLanguagesResponse,
+    PoolStatsResponse,
+    CacheStatsResponse,
+    ReadinessResponse,
+    ResourceProfilesResponse
 )
-from utils.code_execution.code_executer import CodeExecutor, CodeExecutionError
+from utils.code_execution.code_executer import CodeExecutionError, reserved_paths
+from utils.code_execution.execution_service import (
+    ExecutionService,
+    ExecutionQueueFullError,
+    ExecutionQuotaExceededError,
+)
+from utils.code_execution.fair_scheduler import Principal
+from utils.code_execution.factory import create_executor
+from utils.code_execution.project import check_reserved, decode_files
+from utils.numeric import parse_memory
 from utils.rate_limiter import limiter
 from utils.constants import constants
+from core.config import settings
+from apis.deps import get_execution_principal, get_staff_user
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Code Execution"])
 
-try:
-    executor = CodeExecutor()
-except CodeExecutionError as e:
-    print(f"Warning: Code executor initialization failed: {e}")
-    executor = None
+# Created by start_code_execution() from the app lifespan
+executor = None
+execution_service = None
+warmup = {"finished": False, "languages": {}}
+_warmup_task = None
+
+
+async def start_code_execution():
+    """Create the executor and start pulling images and warming up in the background."""
+    global executor, execution_service, _warmup_task
+    try:
+        executor = await asyncio.to_thread(create_executor)
+    except CodeExecutionError as e:
+        logger.warning("Code executor initialization failed: %s", e)
+        return
+    
+    execution_service = ExecutionService(
+        executor,
+        max_concurrency=settings.CODE_EXECUTION_MAX_CONCURRENCY,
+        max_queue_size=settings.CODE_EXECUTION_MAX_QUEUE_SIZE,
+        queue_timeout=settings.CODE_EXECUTION_QUEUE_TIMEOUT,
+        memory_budget=parse_memory(settings.CODE_EXECUTION_MEMORY_BUDGET) if settings.CODE_EXECUTION_MEMORY_BUDGET else None,
+        cpu_budget=settings.CODE_EXECUTION_CPU_BUDGET or None,
+        max_queued_per_user=settings.CODE_EXECUTION_MAX_QUEUED_PER_USER,
+        quota_window=settings.CODE_EXECUTION_QUOTA_WINDOW,
+    )
+    _warmup_task = asyncio.create_task(warm_up_languages())
+
+
+async def stop_code_execution():
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+    if execution_service is not None:
+        execution_service.shutdown()
+    if executor is not None:
+        await asyncio.to_thread(executor.shutdown)
+
+
+async def warm_up_languages():
+    """Pull every language's image concurrently, then run each sample program once."""
+    async def warm_up(language: str):
+        try:
+            if settings.CODE_EXECUTION_PREPULL_IMAGES:
+                warmup["languages"][language] = "pulling"
+                await asyncio.to_thread(executor.prepare, language)
+            if settings.CODE_EXECUTION_WARMUP:
+                warmup["languages"][language] = "warming"
+                await asyncio.to_thread(executor.warm_up, language)
+            warmup["languages"][language] = "ready"
+        except CodeExecutionError as e:
+            logger.warning("Warm-up of %s failed: %s", language, e)
+            warmup["languages"][language] = "failed"
+    
+    await asyncio.gather(*(warm_up(language) for language in executor.get_supported_languages()))
+    warmup["finished"] = True
+
+
+def project_files(files, reserved=()):
+    """
+    Decode request project files, turning invalid paths or sizes, or paths in
+    `reserved` (see reserved_paths()), into a 400.
+    """
+    try:
+        decoded = decode_files(
+            [file.model_dump() for file in files] if files else None,
+            settings.CODE_EXECUTION_MAX_PROJECT_BYTES,
+        )
+        check_reserved(decoded, list(reserved))
+        return decoded
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness(response: Response):
+    """
+    Report ready once start-up image pulls and warm-up runs have finished.
+    Responds with 503 until then, so load balancers hold traffic back.
+    Languages whose warm-up failed are listed as "failed".
+    """
+    ready = executor is not None and warmup["finished"]
+    if not ready:
+        response.status_code = 503
+    return ReadinessResponse(ready=ready, languages=warmup["languages"])
 
 
 @router.post("/execute", response_model=CodeExecutionResponse)
 @limiter.limit(constants.SLOW_RATE_LIMIT)
-async def execute_code(request: Request, data: CodeExecutionRequest):
+async def execute_code(
+    request: Request,
+    data: CodeExecutionRequest,
+    principal: Principal = Depends(get_execution_principal),
+):
     if executor is None:
         raise HTTPException(
             status_code=503,
             detail="Code execution service is not available. Make sure Docker is running."
         )
     
+    files = project_files(data.files, reserved_paths(data.language.lower(), stdin=data.stdin))
     try:
-        result = executor.execute(
+        result = await execution_service.execute(
+            principal,
             code=data.code,
             language=data.language.lower(),
-            stdin=data.stdin
+            stdin=data.stdin,
+            files=files
         )
         return CodeExecutionResponse(**result)
     
+    except ExecutionQuotaExceededError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ExecutionQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -41,6 +162,112 @@ async def execute_code(request: Request, data: CodeExecutionRequest):
         )
 
 
+@router.post("/execute/batch", response_model=BatchExecutionResponse)
+@limiter.limit(constants.SLOW_RATE_LIMIT)
+async def execute_code_batch(
+    request: Request,
+    data: BatchExecutionRequest,
+    principal: Principal = Depends(get_execution_principal),
+):
+    """
+    Compile once and run the code against every test case in a single sandbox.
+    """
+    if executor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Code execution service is not available. Make sure Docker is running."
+        )
+    
+    files = project_files(data.files, reserved_paths(data.language.lower(), test_cases=data.test_cases))
+    try:
+        result = await execution_service.execute_batch(
+            principal,
+            code=data.code,
+            language=data.language.lower(),
+            test_cases=[case.model_dump() for case in data.test_cases],
+            stop_on_failure=data.stop_on_failure,
+            files=files
+        )
+        return BatchExecutionResponse(**result)
+    
+    except ExecutionQuotaExceededError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ExecutionQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Code execution failed: {str(e)}"
+        )
+
+
+@router.post("/execute/stream")
+@limiter.limit(constants.SLOW_RATE_LIMIT)
+async def execute_code_stream(
+    request: Request,
+    data: CodeExecutionRequest,
+    principal: Principal = Depends(get_execution_principal),
+):
+    """
+    Execute code and stream its output as Server-Sent Events.
+    Emits `stdout` / `stderr` events with {"data": "..."} as the program writes,
+    then a final `exit` event with exit_code, execution_time and error. A run
+    refused while waiting for a sandbox ends with an `error` event instead.
+    """
+    if executor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Code execution service is not available. Make sure Docker is running."
+        )
+    
+    files = project_files(data.files, reserved_paths(data.language.lower(), stdin=data.stdin))
+    try:
+        events = execution_service.stream(
+            principal,
+            code=data.code,
+            language=data.language.lower(),
+            stdin=data.stdin,
+            files=files
+        )
+    except ExecutionQuotaExceededError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ExecutionQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    async def event_stream():
+        try:
+            async for event, payload in events:
+                if event != "exit":
+                    payload = {"data": payload}
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except (ExecutionQuotaExceededError, ExecutionQueueFullError) as e:
+            # The response has already started, so the status code can no longer say so
+            payload = {"error": str(e), "retry_after": e.retry_after}
+            yield f"event: error\ndata: {json.dumps(payload)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/languages", response_model=SupportedLanguagesResponse)
 async def get_supported_languages():
     """
@@ -54,4 +281,51 @@ async def get_supported_languages():
     
     return SupportedLanguagesResponse(
         languages=executor.get_supported_languages()
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/pool-stats", response_model=PoolStatsResponse, dependencies=[Depends(get_staff_user)])
+async def get_pool_stats():
+    """
+    Get warm container pool hits, misses and recycle counts per language.
+    """
+    if executor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Code execution service is not available."
+        )
+    
+    return PoolStatsResponse(languages=executor.get_pool_stats())
+
+
+
+@router.get("/cache-stats", response_model=CacheStatsResponse, dependencies=[Depends(get_staff_user)])
+async def get_cache_stats():
+    """
+    Get result and compiled artifact cache hit/miss counters.
+    """
+    if executor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Code execution service is not available."
+        )
+    
+    return CacheStatsResponse(**executor.get_cache_stats())
+
+
+@router.get("/resource-profiles", response_model=ResourceProfilesResponse, dependencies=[Depends(get_staff_user)])
+async def get_resource_profiles():
+    """
+    Get observed peak memory and CPU per language, what admission control
+    reserves for a run of each, and the current reservations.
+    """
+    if executor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Code execution service is not available."
+        )
+    
+    return ResourceProfilesResponse(
+        languages=executor.get_resource_profiles(),
+        admission=execution_service.stats(),
+    )
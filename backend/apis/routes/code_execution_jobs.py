@@ -0,0 +1,166 @@
+import logging
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, status
+from schemas.code_execution import (
+    CodeExecutionRequest,
+    BatchExecutionRequest,
+    JobSubmitResponse,
+    JobStatusResponse
+)
+from utils.code_execution.factory import create_job_queue
+from utils.code_execution.jobs import JobStatus
+from utils.code_execution.code_executer import reserved_paths
+from utils.code_execution.execution_service import ExecutionQuotaExceededError
+from utils.code_execution.fair_scheduler import Principal
+from apis.routes import code_execution
+from apis.routes.code_execution import project_files
+from apis.deps import get_execution_principal
+from utils.rate_limiter import limiter
+from utils.constants import constants
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Code Execution Jobs"])
+
+# Seconds between passes charging finished jobs to their principals' CPU quota
+CHARGE_INTERVAL = 1.0
+
+# Created by start_jobs() from the app lifespan
+job_queue = None
+_charge_task = None
+
+
+async def start_jobs():
+    global job_queue, _charge_task
+    job_queue = await asyncio.to_thread(create_job_queue)
+    _charge_task = asyncio.create_task(charge_finished_jobs())
+
+
+async def stop_jobs():
+    if _charge_task is not None:
+        _charge_task.cancel()
+
+
+async def charge_finished_jobs():
+    """Count the CPU time of jobs the workers finished against the quota of whoever submitted them."""
+    while True:
+        await asyncio.sleep(CHARGE_INTERVAL)
+        if code_execution.execution_service is None:
+            continue  # No quota to charge in this process
+        try:
+            charges = await asyncio.to_thread(job_queue.collect_charges)
+        except Exception as e:
+            logger.warning("Failed to collect job charges: %s", e)
+            continue
+        for principal_key, kind, result in charges:
+            principal = Principal(principal_key)
+            for case in result.get("results", []) if kind == "batch" else [result]:
+                if not case.get("cached"):
+                    code_execution.execution_service.charge(principal, case)
+
+
+def get_job_queue():
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Code execution jobs are not available.")
+    return job_queue
+
+
+async def submit_job(kind: str, payload: dict, principal: Principal) -> JobSubmitResponse:
+    queue = get_job_queue()
+    if code_execution.execution_service is not None:
+        try:
+            code_execution.execution_service.check_quota(principal)
+        except ExecutionQuotaExceededError as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)}
+            )
+    
+    pending = await asyncio.to_thread(queue.pending_count)
+    if pending >= settings.CODE_EXECUTION_JOB_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Code execution queue is full. Please retry later.",
+            headers={"Retry-After": "5"}
+        )
+    pending = await asyncio.to_thread(queue.pending_count, principal.key)
+    if pending >= settings.CODE_EXECUTION_JOB_MAX_PENDING_PER_USER:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many pending jobs. Please wait for some to finish.",
+            headers={"Retry-After": "5"}
+        )
+    
+    job_id = await asyncio.to_thread(queue.submit, kind, payload, principal)
+    return JobSubmitResponse(job_id=job_id, status=JobStatus.QUEUED)
+
+
+@router.post("/jobs", response_model=JobSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit(constants.SLOW_RATE_LIMIT)
+async def submit_execution_job(
+    request: Request,
+    data: CodeExecutionRequest,
+    principal: Principal = Depends(get_execution_principal),
+):
+    """
+    Queue code for execution by the worker pool and return a job ID.
+    Workers pick jobs in fair order across users, and finished jobs count
+    against the submitter's CPU quota.
+    """
+    project_files(data.files, reserved_paths(data.language.lower(), stdin=data.stdin))
+    return await submit_job("execute", {
+        "code": data.code,
+        "language": data.language.lower(),
+        "stdin": data.stdin,
+        "files": [file.model_dump() for file in data.files] if data.files else None,
+    }, principal)
+
+
+@router.post("/jobs/batch", response_model=JobSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit(constants.SLOW_RATE_LIMIT)
+async def submit_batch_job(
+    request: Request,
+    data: BatchExecutionRequest,
+    principal: Principal = Depends(get_execution_principal),
+):
+    """
+    Queue a batch of test cases for execution by the worker pool.
+    """
+    project_files(data.files, reserved_paths(data.language.lower(), test_cases=data.test_cases))
+    return await submit_job("batch", {
+        "code": data.code,
+        "language": data.language.lower(),
+        "test_cases": [case.model_dump() for case in data.test_cases],
+        "stop_on_failure": data.stop_on_failure,
+        "files": [file.model_dump() for file in data.files] if data.files else None,
+    }, principal)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=30, description="Seconds to long-poll for completion")):
+    """
+    Get a job's status and, once finished, its result.
+    With `wait`, the request is held until the job finishes or the wait elapses.
+    """
+    queue = get_job_queue()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        job = await asyncio.to_thread(queue.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["status"] in JobStatus.FINISHED or loop.time() >= deadline:
+            break
+        await asyncio.sleep(0.1)
+    
+    return JobStatusResponse(
+        job_id=job["id"],
+        kind=job["kind"],
+        status=job["status"],
+        result=job["result"],
+        error=job["error"],
+        created_at=job["created_at"],
+        finished_at=job["finished_at"],
+    )
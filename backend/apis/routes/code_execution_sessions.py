@@ -0,0 +1,132 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from schemas.code_execution import (
+    SessionCreateRequest,
+    SessionResponse,
+    SessionExecuteRequest,
+    SessionExecuteResponse
+)
+from database.models.user import User
+from apis.deps import get_current_user, get_execution_principal
+from apis.routes import code_execution
+from utils.code_execution.sessions import SessionManager, SessionError, SessionNotFoundError, SessionLimitError
+from utils.code_execution.execution_service import ExecutionQueueFullError, ExecutionQuotaExceededError
+from utils.code_execution.fair_scheduler import Principal
+from utils.numeric import parse_memory
+from utils.rate_limiter import limiter
+from utils.constants import constants
+from core.config import settings
+
+router = APIRouter(tags=["Code Execution Sessions"])
+
+# Created by start_sessions() from the app lifespan, once the executor exists
+session_manager = None
+
+
+def start_sessions():
+    global session_manager
+    if code_execution.executor is None:
+        return
+    session_manager = SessionManager(
+        code_execution.executor,
+        idle_timeout=settings.CODE_EXECUTION_SESSION_IDLE_TIMEOUT,
+        max_per_user=settings.CODE_EXECUTION_SESSION_MAX_PER_USER,
+        max_memory=parse_memory(settings.CODE_EXECUTION_SESSION_MAX_MEMORY),
+    )
+    session_manager.start()
+
+
+async def stop_sessions():
+    if session_manager is not None:
+        await asyncio.to_thread(session_manager.shutdown)
+
+
+def require_sessions(current_user: Optional[User]):
+    if current_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if session_manager is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Code execution service is not available. Make sure Docker is running."
+        )
+
+
+@router.post("/sessions", response_model=SessionResponse, status_code=status.HTTP_201_CREATED)
+@limiter.limit(constants.SLOW_RATE_LIMIT)
+async def create_session(request: Request, data: SessionCreateRequest, current_user: Optional[User] = Depends(get_current_user)):
+    """
+    Start a long-lived interpreter for the current user.
+    Sessions close after a period of inactivity.
+    """
+    require_sessions(current_user)
+    try:
+        session = await asyncio.to_thread(session_manager.create, str(current_user.id), data.language.lower())
+    except SessionLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except SessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start session: {str(e)}")
+    return SessionResponse(**session.info())
+
+
+@router.get("/sessions", response_model=list[SessionResponse])
+async def list_sessions(current_user: Optional[User] = Depends(get_current_user)):
+    require_sessions(current_user)
+    return [SessionResponse(**session.info()) for session in session_manager.list(str(current_user.id))]
+
+
+@router.post("/sessions/{session_id}/execute", response_model=SessionExecuteResponse)
+@limiter.limit(constants.SESSION_RATE_LIMIT)
+async def execute_in_session(
+    request: Request,
+    session_id: str,
+    data: SessionExecuteRequest,
+    current_user: Optional[User] = Depends(get_current_user),
+    principal: Principal = Depends(get_execution_principal),
+):
+    """
+    Run a snippet in an existing session. Variables, imports and functions
+    defined by earlier snippets are still available. Snippets wait for a slot
+    and count against the CPU quota like any other execution.
+    """
+    require_sessions(current_user)
+    try:
+        result = await code_execution.execution_service.call(
+            session_manager.execute,
+            principal,
+            session_id=session_id,
+            user_id=str(current_user.id),
+            code=data.code,
+            stdin=data.stdin,
+        )
+    except ExecutionQuotaExceededError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ExecutionQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except SessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except SessionError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Code execution failed: {str(e)}")
+    return SessionExecuteResponse(**result)
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def close_session(session_id: str, current_user: Optional[User] = Depends(get_current_user)):
+    require_sessions(current_user)
+    try:
+        await asyncio.to_thread(session_manager.close, session_id, str(current_user.id))
+    except SessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -14,6 +14,7 @@ class Settings(BaseSettings):
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
     ADMIN_USERNAME: str = Field(..., env="ADMIN_USERNAME")
     ADMIN_PASSWORD: str = Field(..., env="ADMIN_PASSWORD")
+    METRICS_TOKEN: str = ""  # Bearer token Prometheus scrapes /metrics with; staff users can always read it
 
     DB_HOST: str = Field(..., env="DB_HOST")
     DB_NAME: str = Field(..., env="DB_NAME")
@@ -26,6 +27,22 @@ class Settings(BaseSettings):
     APP_DESCRIPTION: str = "InteractiveLabs API for using in browser IDE"
 
     OPENROUTER_API_KEY: str = Field(..., env="OPENROUTER_API_KEY")
+    OPENROUTER_MAX_CONNECTIONS: int = 100
+    OPENROUTER_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENROUTER_KEEPALIVE_EXPIRY: float = 30.0
+    OPENROUTER_TIMEOUT: float = 120.0  # Seconds per request; long generations take a while
+    OPENROUTER_CONNECT_TIMEOUT: float = 5.0
+    OPENROUTER_PROVIDER_CONCURRENCY: int = 8  # Requests in flight per provider (e.g. "google")
+    OPENROUTER_PROVIDER_RATE: float = 5.0  # Requests per second per provider; 0 disables
+    OPENROUTER_STATS_WINDOW: int = 100  # Recent requests per model used for latency-aware routing
+    OPENROUTER_STATS_MIN_SAMPLES: int = 10
+    OPENROUTER_MAX_ERROR_RATE: float = 0.5  # Models failing more often get no "random" traffic
+    OPENROUTER_HEDGE_REQUESTS: bool = False  # Also ask the fallback model once the primary is slower than its p95
+    LLM_CACHE_SIZE: int = 1024  # Responses kept in each worker; 0 disables the response cache
+    LLM_CACHE_TTL: int = 24 * 3600
+    LLM_CACHE_DB_PATH: str = "llm_cache.sqlite3"  # Shared by the workers on a host; empty keeps the cache in memory only
+    LLM_CACHE_MAX_TEMPERATURE: float = 1.0  # Requests above this are never served from the cache
+    LLM_SINGLE_FLIGHT: bool = True  # Identical concurrent requests share one upstream call
 
     LANGFUSE_PUBLIC_KEY: str = Field(..., env="LANGFUSE_PUBLIC_KEY")
     LANGFUSE_SECRET_KEY: str = Field(..., env="LANGFUSE_SECRET_KEY")
@@ -37,6 +54,49 @@ class Settings(BaseSettings):
     FROM_EMAIL: str = Field(..., env="FROM_EMAIL")
     BREVO_SECRET_API_KEY: str = Field(..., env="BREVO_API_KEY")
 
+    RATE_LIMIT_STORAGE_URI: str = "sqlite:///rate_limits.sqlite3"  # Shared by all workers; "redis://host:6379" across hosts, "memory://" per process
+    RATE_LIMIT_SYNC_INTERVAL: float = 0.25  # Counts hits in-process and syncs with the shared store every this many seconds; 0 writes through on every request
+    CODE_EXECUTION_BACKEND: str = ""  # Force one sandbox backend for every language (e.g. "fake" for load tests)
+    CODE_EXECUTION_LOCAL_ISOLATE_NETWORK: bool = True
+    CODE_EXECUTION_FAKE_LATENCY: float = 0.0
+    CODE_EXECUTION_POOL_MIN_SIZE: int = 1
+    CODE_EXECUTION_POOL_MAX_SIZE: int = 4
+    CODE_EXECUTION_POOL_MAX_USES: int = 50
+    CODE_EXECUTION_CONTAINER_MAX_AGE: int = 3600  # Pooled containers are retired after this; others' after twice it
+    CODE_EXECUTION_REAPER_INTERVAL: float = 60.0
+    CODE_EXECUTION_ZYGOTE: bool = False  # Start python runs from a resident zygote in each container instead of a fresh interpreter
+    CODE_EXECUTION_DOCKER_HOSTS: str = ""  # Comma-separated Docker endpoints (e.g. "unix:///var/run/docker.sock,tcp://10.0.0.2:2375"); empty uses the local daemon
+    CODE_EXECUTION_HOST_MAX_CONCURRENCY: int = 8  # Executions running at once on each Docker host
+    CODE_EXECUTION_HOST_HEALTH_INTERVAL: float = 10.0
+    CODE_EXECUTION_MAX_CONCURRENCY: int = 4
+    CODE_EXECUTION_MAX_QUEUE_SIZE: int = 16
+    CODE_EXECUTION_QUEUE_TIMEOUT: float = 30.0
+    CODE_EXECUTION_MAX_QUEUED_PER_USER: int = 4  # Waiting executions one user (or anonymous IP) may have
+    CODE_EXECUTION_USER_CPU_QUOTA: float = 300.0  # CPU seconds per user per quota window; 0 disables (staff are exempt)
+    CODE_EXECUTION_QUOTA_WINDOW: int = 3600
+    CODE_EXECUTION_ANONYMOUS_WEIGHT: float = 0.5  # Fair share of an anonymous IP relative to a signed-in user
+    CODE_EXECUTION_MEMORY_BUDGET: str = ""  # e.g. "8g": admit runs by the memory they actually use; empty disables
+    CODE_EXECUTION_CPU_BUDGET: float = 0.0  # Cores, same for CPU; 0 disables
+    CODE_EXECUTION_PROFILE_WINDOW: int = 200  # Recent runs per language kept for usage estimates
+    CODE_EXECUTION_PROFILE_HEADROOM: float = 1.25  # Reserve p95 usage times this
+    CODE_EXECUTION_LANGUAGES_FILE: str = ""  # JSON language settings, reloaded on change; empty uses the bundled languages.json
+    CODE_EXECUTION_MAX_OUTPUT_BYTES: int = 64 * 1024
+    CODE_EXECUTION_ARTIFACT_CACHE_SIZE: int = 256
+    CODE_EXECUTION_RESULT_CACHE_SIZE: int = 1024  # 0 disables the result cache
+    CODE_EXECUTION_RESULT_CACHE_TTL: int = 3600
+    CODE_EXECUTION_JOB_DB_PATH: str = "code_execution_jobs.sqlite3"
+    CODE_EXECUTION_JOB_WORKERS: int = 2
+    CODE_EXECUTION_JOB_MAX_PENDING: int = 1000
+    CODE_EXECUTION_JOB_MAX_PENDING_PER_USER: int = 50  # Queued and running jobs one user (or anonymous IP) may have
+    CODE_EXECUTION_JOB_STALE_AFTER: int = 300  # Seconds without a worker heartbeat before a running job is handed out again
+    CODE_EXECUTION_JOB_RESULT_TTL: int = 3600
+    CODE_EXECUTION_PREPULL_IMAGES: bool = True  # Pull missing sandbox images at startup
+    CODE_EXECUTION_WARMUP: bool = True  # Run each language's sample program once at startup
+    CODE_EXECUTION_SESSION_IDLE_TIMEOUT: int = 600
+    CODE_EXECUTION_SESSION_MAX_PER_USER: int = 2
+    CODE_EXECUTION_SESSION_MAX_MEMORY: str = "2g"  # Sum of the memory limits of all open sessions
+    CODE_EXECUTION_MAX_PROJECT_BYTES: int = 32 * 1024 * 1024  # Total size of a request's project files
+
     @property
     def DB_URL(self):
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
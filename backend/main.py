@@ -1,6 +1,10 @@
-from fastapi import FastAPI, Request, Response
+import json
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
 from core.config import settings
-from utils.openrouter.completion import text_completion_with_tracing
+from utils.openrouter.completion import stream_completion_with_tracing, text_completion_with_tracing
+from utils.openrouter.router import openrouter_client
 from schemas.completion import CompletionRequest
 from utils.rate_limiter import limiter
 from utils.constants import constants
@@ -11,10 +15,27 @@ from admin.user import UserAdmin
 from sqladmin import Admin
 from database.db import engine
 from apis.base import router as api_router
+from apis.deps import require_metrics_access
+from apis.routes.code_execution import start_code_execution, stop_code_execution
+from apis.routes.code_execution_sessions import start_sessions, stop_sessions
+from apis.routes.code_execution_jobs import start_jobs, stop_jobs
 from fastapi.middleware.cors import CORSMiddleware
+from utils.code_execution import metrics
 
 
-app = FastAPI(title=settings.APP_NAME, description=settings.APP_DESCRIPTION, docs_url="/api/docs")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_code_execution()
+    start_sessions()
+    await start_jobs()
+    yield
+    await stop_jobs()
+    await stop_sessions()
+    await stop_code_execution()
+    await openrouter_client.aclose()
+
+
+app = FastAPI(title=settings.APP_NAME, description=settings.APP_DESCRIPTION, docs_url="/api/docs", lifespan=lifespan)
 app.include_router(api_router)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 admin = Admin(app, engine, authentication_backend=AdminAuth(secret_key=settings.SECRET_KEY))
@@ -25,6 +46,11 @@ async def root(request: Request):
     return {"message": "Hello World"}
 
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def prometheus_metrics():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/completion")
 @limiter.limit(constants.ONE_PER_ONE_MINUTE)
 async def completion(request: Request, data: CompletionRequest):
@@ -33,10 +59,40 @@ async def completion(request: Request, data: CompletionRequest):
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": data.user_prompt},
     ]
-    response = text_completion_with_tracing(messages, data.model)
+    response = await text_completion_with_tracing(messages, data.model)
     return {"response": response.choices[0].message.content}
 
 
+@app.post("/completion/stream")
+@limiter.limit(constants.ONE_PER_ONE_MINUTE)
+async def completion_stream(request: Request, data: CompletionRequest):
+    """
+    Stream the response as Server-Sent Events: `token` events with
+    {"data": "..."} as the model generates, then a `done` event with the model
+    that answered, token usage and finish_reason (or an `error` event).
+    """
+    system_prompt = "Please respond to the user's prompt in a friendly and helpful manner."
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": data.user_prompt},
+    ]
+
+    async def event_stream():
+        try:
+            async for event, payload in stream_completion_with_tracing(messages, data.model):
+                if event == "token":
+                    payload = {"data": payload}
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/email")
 @limiter.limit(constants.ONE_PER_ONE_MINUTE)
 def send_email_api(request: Request, data: EmailRequest):
@@ -1,11 +1,18 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Any, Literal
+
+
+class ProjectFile(BaseModel):
+    path: str = Field(..., description="Path relative to the project root, e.g. utils/helpers.py")
+    content: str = Field(..., description="File content, as text or base64")
+    encoding: Literal["utf-8", "base64"] = Field("utf-8", description="Use base64 for binary assets")
 
 
 class CodeExecutionRequest(BaseModel):    
     code: str = Field(..., description="Source code to execute")
     language: str = Field(..., description="Programming language (python, javascript, java, etc.)")
     stdin: Optional[str] = Field(None, description="Optional input to pass to the program")
+    files: Optional[list[ProjectFile]] = Field(None, max_length=200, description="Extra project files placed next to the code")
     
     class Config:
         json_schema_extra = {
@@ -23,6 +30,13 @@ class CodeExecutionResponse(BaseModel):
     exit_code: int = Field(..., description="Exit code (0 = success)")
     execution_time: float = Field(..., description="Execution time in seconds")
     error: Optional[str] = Field(None, description="Error message if execution failed")
+    timed_out: bool = Field(False, description="Whether the program was killed for exceeding its time limit")
+    truncated: bool = Field(False, description="Whether output was cut off at the size limit")
+    cached: bool = Field(False, description="Whether the result was served from the result cache")
+    oom_killed: bool = Field(False, description="Whether the program was killed for exceeding its memory limit")
+    cpu_time: Optional[float] = Field(None, description="CPU seconds used by the program itself, when known")
+    peak_memory: Optional[int] = Field(None, description="Peak memory in bytes used by the program, when known")
+    overhead_time: Optional[float] = Field(None, description="Seconds spent outside the program (sandbox setup, upload, compile)")
     
     class Config:
         json_schema_extra = {
@@ -31,11 +45,57 @@ class CodeExecutionResponse(BaseModel):
                 "stderr": "",
                 "exit_code": 0,
                 "execution_time": 0.123,
-                "error": None
+                "error": None,
+                "timed_out": False,
+                "truncated": False,
+                "cached": False,
+                "oom_killed": False,
+                "cpu_time": 0.021,
+                "peak_memory": 9437184,
+                "overhead_time": 0.015
+            }
+        }
+
+
+class TestCase(BaseModel):
+    stdin: Optional[str] = Field(None, description="Input passed to the program for this case")
+    expected_output: Optional[str] = Field(None, description="Expected stdout; trailing whitespace is ignored")
+
+
+class BatchExecutionRequest(BaseModel):
+    code: str = Field(..., description="Source code to execute")
+    language: str = Field(..., description="Programming language (python, javascript, java, etc.)")
+    test_cases: list[TestCase] = Field(..., min_length=1, max_length=50, description="Inputs to run the program against")
+    stop_on_failure: bool = Field(False, description="Stop at the first failing test case")
+    files: Optional[list[ProjectFile]] = Field(None, max_length=200, description="Extra project files placed next to the code")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "code": "print(int(input()) * 2)",
+                "language": "python",
+                "test_cases": [
+                    {"stdin": "2", "expected_output": "4"},
+                    {"stdin": "5", "expected_output": "10"}
+                ],
+                "stop_on_failure": False
             }
         }
 
 
+class TestCaseResult(CodeExecutionResponse):
+    passed: bool = Field(..., description="Exit code 0, no timeout and stdout matched expected_output (if given)")
+
+
+class BatchExecutionResponse(BaseModel):
+    results: list[TestCaseResult] = Field(..., description="Per test case results, in order; shorter than test_cases if stopped early")
+    passed: int = Field(..., description="Number of passing test cases")
+    total: int = Field(..., description="Number of submitted test cases")
+    execution_time: float = Field(..., description="Total time in seconds, including compilation")
+    stderr: str = Field("", description="Compiler output or sandbox error, if the batch could not run")
+    error: Optional[str] = Field(None, description="Error message if the batch could not run")
+
+
 class SupportedLanguagesResponse(BaseModel):    
     languages: list[str] = Field(..., description="List of supported programming languages")
     
@@ -44,4 +104,108 @@ class SupportedLanguagesResponse(BaseModel):
             "example": {
                 "languages": ["python", "javascript", "java", "cpp", "go"]
             }
-        }
\ No newline at end of file
+        }
+
+
+class LanguagePoolStats(BaseModel):
+    idle: int = Field(..., description="Warm containers currently waiting in the pool")
+    hits: int = Field(..., description="Executions served by a warm container")
+    misses: int = Field(..., description="Executions that had to create a container")
+    created: int = Field(..., description="Containers created by the pool")
+    recycled: int = Field(..., description="Containers removed instead of being reused")
+
+
+class PoolStatsResponse(BaseModel):
+    languages: dict[str, LanguagePoolStats] = Field(..., description="Pool statistics per language")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "languages": {
+                    "python": {"idle": 1, "hits": 42, "misses": 3, "created": 4, "recycled": 2}
+                }
+            }
+        }
+
+
+
+class CacheStats(BaseModel):
+    entries: int = Field(..., description="Entries currently cached")
+    hits: int = Field(..., description="Lookups answered from the cache")
+    misses: int = Field(..., description="Lookups that were not cached")
+
+
+class CacheStatsResponse(BaseModel):
+    result_cache: Optional[CacheStats] = Field(None, description="Execution result cache, null when disabled")
+    artifact_cache: CacheStats = Field(..., description="Compiled artifact cache")
+
+
+
+class LanguageResourceProfile(BaseModel):
+    memory_samples: int = Field(..., description="Recent runs with a memory measurement")
+    memory_p50: Optional[int] = Field(None, description="Median peak memory in bytes")
+    memory_p95: Optional[int] = Field(None, description="95th percentile peak memory in bytes")
+    memory_max: Optional[int] = Field(None, description="Largest peak memory in bytes")
+    cpu_samples: int = Field(..., description="Recent runs with a CPU measurement")
+    cpu_p50: Optional[float] = Field(None, description="Median cores used")
+    cpu_p95: Optional[float] = Field(None, description="95th percentile cores used")
+    reserve_memory: int = Field(..., description="Bytes admission control reserves per run")
+    reserve_cpu: float = Field(..., description="Cores admission control reserves per run")
+
+
+class ResourceProfilesResponse(BaseModel):
+    languages: dict[str, LanguageResourceProfile] = Field(..., description="Observed usage per language")
+    admission: dict[str, Any] = Field(..., description="Running executions, reservations and budgets")
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str = Field(..., description="ID to poll with GET /jobs/{job_id}")
+    status: str = Field(..., description="Job status (queued, running, completed, failed)")
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str = Field(..., description="execute or batch")
+    status: str = Field(..., description="Job status (queued, running, completed, failed)")
+    result: Optional[dict[str, Any]] = Field(None, description="CodeExecutionResponse or BatchExecutionResponse once completed")
+    error: Optional[str] = Field(None, description="Worker error if the job failed")
+    created_at: float = Field(..., description="Submission time (unix seconds)")
+    finished_at: Optional[float] = Field(None, description="Completion time (unix seconds)")
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool = Field(..., description="Whether start-up image pulls and warm-up runs have finished")
+    languages: dict[str, str] = Field(default_factory=dict, description="Warm-up state per language (pulling, warming, ready, failed)")
+
+
+class SessionCreateRequest(BaseModel):
+    language: str = Field(..., description="Interpreter to keep running (python, javascript)")
+
+
+class SessionResponse(BaseModel):
+    session_id: str
+    language: str
+    created_at: float = Field(..., description="Unix timestamp")
+    idle_seconds: float = Field(..., description="Seconds since the session last ran a snippet")
+
+
+class SessionExecuteRequest(BaseModel):
+    code: str = Field(..., description="Snippet to run in the session; state persists between snippets")
+    stdin: Optional[str] = Field(None, description="Input available to the snippet")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "code": "x = 21\nx * 2",
+                "stdin": None
+            }
+        }
+
+
+class SessionExecuteResponse(BaseModel):
+    stdout: str = Field(..., description="Output printed by the snippet, plus the value of a trailing expression")
+    stderr: str = Field(..., description="Standard error, including tracebacks")
+    execution_time: float = Field(..., description="Round-trip time in seconds")
+    error: Optional[str] = Field(None, description="Exception raised by the snippet, if any")
+    timed_out: bool = Field(False, description="Whether the snippet hit the time limit (the session is then closed)")
+    truncated: bool = Field(False, description="Whether output was cut off at the size limit")
@@ -0,0 +1,66 @@
+"""
+In-memory LRU cache of compiled build outputs (e.g. Java .class files),
+keyed by a hash of the source and the image that compiled it.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from utils.code_execution.project import files_digest
+
+
+class ArtifactCache:
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key(code: str, config, files: Optional[Dict[str, bytes]] = None) -> str:
+        digest = hashlib.sha256()
+        for part in (config.image, config.compile_cmd, code):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        if files:
+            # Other sources in the project are compiled too
+            digest.update(files_digest(files).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return artifact
+
+    def put(self, key: str, artifact: bytes):
+        if self.max_entries <= 0 or len(artifact) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = artifact
+            self._size += len(artifact)
+
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
@@ -0,0 +1,162 @@
+"""
+Benchmark for the code execution pipeline.
+Runs each language's sample program at increasing concurrency levels and
+reports latency percentiles, throughput and per-phase timings as JSON. With
+the docker backend, each level also reports the container lifecycle phases
+(create, start, wipe, remove) the pool ran meanwhile, in requests or in the
+background.
+
+Usage:
+    python -m utils.code_execution.benchmark --backend fake --concurrency 1,4,16
+    python -m utils.code_execution.benchmark --backend docker --no-pool --output bench.json
+"""
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+from utils.code_execution.code_executer import CodeExecutor
+from utils.code_execution.language_config import get_language_config, get_supported_languages
+from utils.code_execution.sandbox import DockerBackend, FakeBackend, LocalBackend, SandboxBackend
+from utils.numeric import quantile
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of durations in seconds, reported in milliseconds."""
+    values = values or [0.0]
+    return {
+        "p50_ms": round(quantile(values, 0.50) * 1000, 3),
+        "p95_ms": round(quantile(values, 0.95) * 1000, 3),
+        "p99_ms": round(quantile(values, 0.99) * 1000, 3),
+        "max_ms": round(max(values) * 1000, 3),
+    }
+
+
+def create_backend(name: str, languages: List[str], pool: bool, latency: float) -> SandboxBackend:
+    if name == "docker":
+        return DockerBackend(
+            pool_min_size=1 if pool else 0,
+            pool_max_size=4 if pool else 0,
+            languages=languages,
+        )
+    if name == "local":
+        return LocalBackend()
+    if name == "fake":
+        return FakeBackend(latency=latency)
+    raise ValueError(f"Unknown sandbox backend '{name}'")
+
+
+# Phases that are not reported separately, and why
+PHASE_NOTES = {
+    "tar": "part of put_archive: the tar is streamed to the Docker API while it is built",
+    "stop": "part of remove: containers are removed with force, which kills them in the same call",
+}
+
+
+def run_level(executor: CodeExecutor, language: str, concurrency: int, runs: int, container_pool=None) -> Dict[str, Any]:
+    """Execute the sample program `runs` times with `concurrency` in flight."""
+    code = get_language_config(language).sample_code
+    if container_pool is not None:
+        container_pool.lifecycle_timings(clear=True)
+
+    def run_once(_):
+        started = time.perf_counter()
+        result = executor.execute(code, language)
+        return time.perf_counter() - started, result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run_once, range(runs)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, _ in results]
+    phases = {}
+    for _, result in results:
+        for name, duration in result.get("phases", {}).items():
+            phases.setdefault(name, []).append(duration)
+
+    level = {
+        "language": language,
+        "concurrency": concurrency,
+        "runs": runs,
+        "errors": sum(1 for _, result in results if result["error"] or result["exit_code"] != 0),
+        "runs_per_second": round(runs / elapsed, 2) if elapsed else 0.0,
+        "latency": summarize(latencies),
+        "phases": {name: summarize(values) for name, values in phases.items()},
+    }
+    if container_pool is not None:
+        # Background work still in flight when the level ends is counted in the next one
+        lifecycle = container_pool.lifecycle_timings()
+        level["pool_phases"] = {name: summarize(values) for name, values in lifecycle.items()}
+    return level
+
+
+def print_table(report: Dict[str, Any], out):
+    out.write(f"{'language':<12}{'conc':>6}{'runs/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}\n")
+    for level in report["levels"]:
+        latency = level["latency"]
+        out.write(
+            f"{level['language']:<12}{level['concurrency']:>6}{level['runs_per_second']:>10}"
+            f"{latency['p50_ms']:>10}{latency['p95_ms']:>10}{latency['p99_ms']:>10}{level['errors']:>8}\n"
+        )
+        for name, stats in level["phases"].items():
+            out.write(f"{'':<12}{name:>16}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}\n")
+        for name, stats in level.get("pool_phases", {}).items():
+            out.write(f"{'':<12}{'pool ' + name:>16}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark code execution")
+    parser.add_argument("--backend", choices=["docker", "local", "fake"], default="fake")
+    parser.add_argument("--languages", default=",".join(get_supported_languages()),
+                        help="Comma separated languages to benchmark")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma separated concurrency levels")
+    parser.add_argument("--runs", type=int, default=50, help="Executions per language and concurrency level")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed executions per language")
+    parser.add_argument("--no-pool", action="store_true",
+                        help="Create and remove a container per run (docker backend only)")
+    parser.add_argument("--no-artifact-cache", action="store_true", help="Always recompile")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="Simulated run time for the fake backend")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    languages = [language for language in args.languages.split(",") if language]
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+
+    backend = create_backend(args.backend, languages, not args.no_pool, args.fake_latency)
+    executor = CodeExecutor(
+        backends={args.backend: backend},
+        artifact_cache_size=0 if args.no_artifact_cache else 256,
+        backend_override=args.backend,
+    )
+
+    report = {
+        "backend": args.backend,
+        "pool": not args.no_pool,
+        "artifact_cache": not args.no_artifact_cache,
+        "phase_notes": PHASE_NOTES,
+        "levels": [],
+    }
+    try:
+        for language in languages:
+            for _ in range(args.warmup):
+                executor.execute(get_language_config(language).sample_code, language)
+            for concurrency in levels:
+                report["levels"].append(
+                    run_level(executor, language, concurrency, args.runs, getattr(backend, "pool", None))
+                )
+    finally:
+        executor.shutdown()
+
+    print_table(report, sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
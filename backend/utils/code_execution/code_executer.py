@@ -1,272 +1,569 @@
 """
-Code execution service using Docker containers.
-Executes user code in isolated environments with resource limits.
+Code execution service.
+Executes user code in isolated sandboxes (Docker containers by default) with resource limits.
 """
+import logging
 import time
-import io
-import tarfile
-import docker
-from typing import Dict, Any, Optional
+import codecs
+import threading
+from typing import Dict, Any, List, Optional, Iterator, Generator, Tuple
 from utils.code_execution.language_config import get_language_config, get_supported_languages
+from utils.code_execution.artifact_cache import ArtifactCache
+from utils.code_execution.result_cache import ResultCache
+from utils.code_execution.resource_profiles import ResourceProfiles
+from utils.code_execution.timing import PhaseTimings
+from utils.code_execution.project import check_reserved
+from utils.code_execution import metrics
+from utils.code_execution.sandbox import DockerBackend, SandboxBackend, SandboxError, SandboxImageNotFound
+
+logger = logging.getLogger(__name__)
 
 
 class CodeExecutionError(Exception):
     pass
 
 
+def source_filename(config) -> str:
+    if config.file_ext == ".java":
+        return "Main.java"
+    return f"main{config.file_ext}"
+
+
+def reserved_paths(language: str, stdin: Optional[str] = None, test_cases: Optional[List[dict]] = None) -> List[str]:
+    """Workspace paths the executor writes itself for a run, which project files must not use."""
+    try:
+        config = get_language_config(language)
+    except ValueError:
+        return []  # The executor reports the unsupported language
+    if test_cases is not None:
+        return [source_filename(config), *(f"inputs/{index}.txt" for index in range(len(test_cases)))]
+    return [source_filename(config), *(["input.txt"] if stdin else [])]
+
+
 class CodeExecutor:
-    """Handles code execution in Docker containers."""
+    """Handles code execution in sandboxes provided by pluggable backends."""
     
-    def __init__(self):
-        try:
-            self.client = docker.from_env()
-            self.client.ping()  # Test Docker connection
-        except Exception as e:
-            raise Exception(
-                f"Failed to connect to Docker. Make sure Docker is running. Error: {str(e)}"
-            )
+    def __init__(
+        self,
+        backends: Optional[Dict[str, SandboxBackend]] = None,
+        max_output_bytes: int = 64 * 1024,
+        artifact_cache_size: int = 256,
+        result_cache: Optional[ResultCache] = None,
+        backend_override: Optional[str] = None,
+        profiles: Optional[ResourceProfiles] = None,
+    ):
+        """
+        `backends` maps a backend name to an instance; each language picks one
+        through LanguageConfig.backend unless `backend_override` forces a single
+        backend for every language. Defaults to a Docker backend.
+        `profiles` collects the memory and CPU each run actually used.
+        """
+        self.max_output_bytes = max_output_bytes
+        self.profiles = profiles or ResourceProfiles()
+        self.artifact_cache = ArtifactCache(max_entries=artifact_cache_size)
+        self.result_cache = result_cache
+        self.backend_override = backend_override
+        
+        if backends is None:
+            try:
+                backends = {"docker": DockerBackend()}
+            except SandboxError as e:
+                raise CodeExecutionError(str(e))
+        self.backends = backends
     
-    def execute(self, code: str, language: str, stdin: Optional[str] = None) -> Dict[str, Any]:
+    def execute(
+        self, code: str, language: str, stdin: Optional[str] = None, files: Optional[Dict[str, bytes]] = None
+    ) -> Dict[str, Any]:
+        output = {"stdout": [], "stderr": []}
+        for event, payload in self.execute_stream(code, language, stdin, files):
+            if event == "exit":
+                return {
+                    "stdout": "".join(output["stdout"]),
+                    "stderr": "".join(output["stderr"]),
+                    **payload,
+                }
+            output[event].append(payload)
+    
+    def execute_stream(
+        self, code: str, language: str, stdin: Optional[str] = None, files: Optional[Dict[str, bytes]] = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Run the code, yielding ("stdout" | "stderr", text) chunks as the program
+        produces them and finally ("exit", result) with exit code and timings.
+        `files` are extra project files (path -> bytes) placed next to the code.
+        Identical submissions are answered from the result cache when enabled.
+        """
         if language not in get_supported_languages():
-            return {
-                "stdout": "",
-                "stderr": "",
+            yield "exit", {
                 "exit_code": 1,
                 "execution_time": 0,
                 "error": f"Unsupported language: {language}. "
                          f"Supported: {', '.join(get_supported_languages())}"
             }
+            return
         
         config = get_language_config(language)
         
-        # Compile if needed (for Java, C++, etc.)
-        if config.compile_cmd:
-            compile_result = self._compile(code, config)
-            if compile_result["error"]:
-                return compile_result
+        cache_key = self._result_cache_key(language, config, code, stdin, files)
+        if cache_key:
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                for name in ("stdout", "stderr"):
+                    if cached[name]:
+                        yield name, cached[name]
+                metrics.EXECUTIONS.inc(language=language, cached="true")
+                yield "exit", {**cached["exit"], "cached": True}
+                return
         
-        # Execute the code
-        return self._run(code, config, stdin)
+        output = {"stdout": [], "stderr": []}
+        for event, payload in self._execute_stream(code, language, config, stdin, files):
+            if event == "exit":
+                if cache_key and payload["error"] is None and not payload.get("timed_out"):
+                    self.result_cache.set(cache_key, {
+                        "stdout": "".join(output["stdout"]),
+                        "stderr": "".join(output["stderr"]),
+                        # Timings describe this run, not the replayed one
+                        "exit": {k: v for k, v in payload.items() if k != "phases"},
+                    })
+            elif cache_key:
+                output[event].append(payload)
+            yield event, payload
     
-    def _compile(self, code: str, config) -> Dict[str, Any]:
+    def _execute_stream(
+        self, code: str, language: str, config, stdin: Optional[str], files: Optional[Dict[str, bytes]]
+    ) -> Iterator[Tuple[str, Any]]:
+        timings = PhaseTimings()
         try:
-            start_time = time.time()            
-            filename = f"Main{config.file_ext}"
-            
-            # Create tar archive with the code file
-            tar_stream = io.BytesIO()
-            tar = tarfile.TarFile(fileobj=tar_stream, mode='w')
+            start_time = time.time()
+            filename = source_filename(config)
             
-            # Add code file to archive
-            code_data = code.encode('utf-8')
-            code_info = tarfile.TarInfo(name=filename)
-            code_info.size = len(code_data)
-            code_info.mtime = time.time()
-            tar.addfile(code_info, io.BytesIO(code_data))
+            extra = {"input.txt": stdin} if stdin else {}
+            workspace = self._workspace_files(filename, code, files, extra)
             
-            tar.close()
-            tar_stream.seek(0)
+            # Compile and run both happen in the same sandbox
+            backend = self._backend(config)
+            with timings.phase("acquire"):
+                sandbox = backend.acquire(language, config, timings)
+        except SandboxImageNotFound as e:
+            metrics.IMAGE_NOT_FOUND.inc(language=language)
+            yield "stderr", str(e)
+            yield "exit", {
+                "exit_code": 1,
+                "execution_time": 0,
+                "error": "Image not found. Please try again after pulling the image."
+            }
+            return
+        except Exception as e:
+            metrics.ERRORS.inc(language=language)
+            yield "stderr", str(e)
+            yield "exit", {"exit_code": 1, "execution_time": 0, "error": f"Execution failed: {str(e)}"}
+            return
+        
+        # The exit event is sent after the sandbox is released so its timings are complete
+        result = None
+        try:
+            with timings.phase("put_archive"):
+                sandbox.put_files(workspace)
             
-            container = self.client.containers.create(
-                image=config.image,
-                command="sleep 3600",
-                network_mode="none",
-                mem_limit=config.memory,
-                cpu_period=config.cpu_period,
-                cpu_quota=config.cpu_quota,
-                working_dir="/workspace",
-            )
+            # Compile if needed (for Java, C++, etc.)
+            if config.compile_cmd:
+                with timings.phase("compile"):
+                    compile_result = self._compile(sandbox, code, filename, config, files)
+                if compile_result["error"]:
+                    self._count_failure(language, compile_result)
+                    for name in ("stdout", "stderr"):
+                        if compile_result[name]:
+                            yield name, compile_result[name]
+                    result = {
+                        "exit_code": compile_result["exit_code"],
+                        "execution_time": round(time.time() - start_time, 3),
+                        "error": compile_result["error"],
+                        "timed_out": compile_result.get("timed_out", False),
+                        "truncated": compile_result.get("truncated", False),
+                    }
             
-            try:
-                container.start()
-                container.put_archive('/workspace', tar_stream)
-                compile_cmd = config.compile_cmd.format(file=filename)
-                exec_result = container.exec_run(
-                    cmd=f"sh -c '{compile_cmd}'",
-                    workdir="/workspace",
-                    demux=True,
-                )
-                
-                execution_time = time.time() - start_time
-                
-                # Parse output
-                stdout_bytes, stderr_bytes = exec_result.output
-                stdout = stdout_bytes.decode('utf-8') if stdout_bytes else ""
-                stderr = stderr_bytes.decode('utf-8') if stderr_bytes else ""
+            if result is None:
+                # Execute the code
+                run_cmd = sandbox.run_cmd.format(file=filename)
+                if stdin:
+                    run_cmd = f"{run_cmd} < input.txt"
                 
-                if exec_result.exit_code != 0:
-                    return {
-                        "stdout": stdout,
-                        "stderr": stderr,
-                        "exit_code": exec_result.exit_code,
-                        "execution_time": round(execution_time, 3),
-                        "error": "Compilation failed"
-                    }
+                with timings.phase("exec"):
+                    status = yield from self._exec_stream(sandbox, run_cmd, config.timeout)
                 
-                return {
-                    "stdout": "",
-                    "stderr": "",
-                    "exit_code": 0,
-                    "execution_time": round(execution_time, 3),
-                    "error": None
+                result = {
+                    **status,
+                    "execution_time": round(time.time() - start_time, 3),
+                    "error": self._run_error(status, config),
                 }
-                
-            finally:
-                # Always cleanup container
-                try:
-                    container.stop(timeout=1)
-                except:
-                    pass
-                container.remove(force=True)
-                
-        except docker.errors.ImageNotFound:
-            return {
-                "stdout": "",
-                "stderr": f"Docker image '{config.image}' not found",
-                "exit_code": 1,
-                "execution_time": 0,
-                "error": "Image not found. Please pull the image first."
-            }
-        except docker.errors.ContainerError as e:
-            return {
-                "stdout": "",
-                "stderr": str(e),
-                "exit_code": 1,
-                "execution_time": 0,
-                "error": "Compilation error"
-            }
+                self._count_failure(language, result)
+        
         except Exception as e:
-            return {
-                "stdout": "",
-                "stderr": str(e),
-                "exit_code": 1,
-                "execution_time": 0,
-                "error": f"Compilation failed: {str(e)}"
-            }
+            metrics.ERRORS.inc(language=language)
+            yield "stderr", str(e)
+            result = {"exit_code": 1, "execution_time": 0, "error": f"Execution failed: {str(e)}"}
+        finally:
+            with timings.phase("release"):
+                backend.release(sandbox)
+        
+        phases = timings.as_dict()
+        # Everything that is not the user program running is our overhead
+        result["overhead_time"] = round(time.time() - start_time - phases.get("exec", 0.0), 3)
+        self._record_metrics(language, result, phases)
+        yield "exit", {**result, "phases": phases}
     
-    def _run(
+    def execute_batch(
         self,
         code: str,
-        config,
-        stdin: Optional[str] = None
+        language: str,
+        test_cases: List[Dict[str, Optional[str]]],
+        stop_on_failure: bool = False,
+        files: Optional[Dict[str, bytes]] = None,
     ) -> Dict[str, Any]:
-        """Execute code in container."""
+        """
+        Compile once and run every test case ({"stdin", "expected_output"})
+        in the same sandbox, each with its own timeout.
+        """
+        if language not in get_supported_languages():
+            return {
+                "results": [],
+                "passed": 0,
+                "total": len(test_cases),
+                "execution_time": 0,
+                "stderr": "",
+                "error": f"Unsupported language: {language}. "
+                         f"Supported: {', '.join(get_supported_languages())}"
+            }
+        
+        config = get_language_config(language)
+        start_time = time.time()
+        filename = source_filename(config)
+        
+        inputs = {f"inputs/{index}.txt": case.get("stdin") or "" for index, case in enumerate(test_cases)}
+        
+        timings = PhaseTimings()
+        results = []
         try:
-            start_time = time.time()
-            
-            # Prepare filename
-            filename = f"main{config.file_ext}"
-            if config.file_ext == ".java":
-                filename = "Main.java"
-            
-            # Create tar archive with the code file
-            tar_stream = io.BytesIO()
-            tar = tarfile.TarFile(fileobj=tar_stream, mode='w')
-            
-            # Add code file to archive
-            code_data = code.encode('utf-8')
-            code_info = tarfile.TarInfo(name=filename)
-            code_info.size = len(code_data)
-            code_info.mtime = time.time()
-            tar.addfile(code_info, io.BytesIO(code_data))
-            
-            if stdin:
-                stdin_data = stdin.encode('utf-8')
-                stdin_info = tarfile.TarInfo(name='input.txt')
-                stdin_info.size = len(stdin_data)
-                stdin_info.mtime = time.time()
-                tar.addfile(stdin_info, io.BytesIO(stdin_data))
-            
-            tar.close()
-            tar_stream.seek(0)
-            
-            # Create container
-            container = self.client.containers.create(
-                image=config.image,
-                command="sleep 3600",  # Keep alive temporarily
-                network_mode="none",
-                mem_limit=config.memory,
-                cpu_period=config.cpu_period,
-                cpu_quota=config.cpu_quota,
-                working_dir="/workspace",
-            )
-            
+            workspace = self._workspace_files(filename, code, files, inputs)
+            backend = self._backend(config)
+            with timings.phase("acquire"):
+                sandbox = backend.acquire(language, config, timings)
             try:
-                container.start()
-                container.put_archive('/workspace', tar_stream)
-                
-                run_cmd = config.run_cmd.format(file=filename)
-                if stdin:
-                    run_cmd = f"{run_cmd} < input.txt"
+                with timings.phase("put_archive"):
+                    sandbox.put_files(workspace)
                 
-                exec_result = container.exec_run(
-                    cmd=f"sh -c '{run_cmd}'",
-                    workdir="/workspace",
-                    demux=True,
-                )
-                
-                execution_time = time.time() - start_time
-                
-                stdout_bytes, stderr_bytes = exec_result.output
-                stdout = stdout_bytes.decode('utf-8') if stdout_bytes else ""
-                stderr = stderr_bytes.decode('utf-8') if stderr_bytes else ""
-                
-                return {
-                    "stdout": stdout,
-                    "stderr": stderr,
-                    "exit_code": exec_result.exit_code,
-                    "execution_time": round(execution_time, 3),
-                    "error": None
-                }
+                if config.compile_cmd:
+                    with timings.phase("compile"):
+                        compile_result = self._compile(sandbox, code, filename, config, files)
+                    if compile_result["error"]:
+                        self._count_failure(language, compile_result)
+                        return {
+                            "results": [],
+                            "passed": 0,
+                            "total": len(test_cases),
+                            "execution_time": round(time.time() - start_time, 3),
+                            "stderr": compile_result["stderr"] or compile_result["stdout"],
+                            "error": compile_result["error"],
+                        }
                 
+                run_cmd = sandbox.run_cmd.format(file=filename)
+                for index, case in enumerate(test_cases):
+                    case_start = time.time()
+                    with timings.phase("exec"):
+                        exec_result = self._exec(sandbox, f"{run_cmd} < inputs/{index}.txt", config.timeout)
+                    self._record_usage(language, exec_result, time.time() - case_start)
+                    
+                    error = self._run_error(exec_result, config)
+                    self._count_failure(language, {**exec_result, "error": error})
+                    
+                    expected = case.get("expected_output")
+                    passed = exec_result["exit_code"] == 0 and error is None
+                    if passed and expected is not None:
+                        passed = exec_result["stdout"].rstrip() == expected.rstrip()
+                    
+                    results.append({
+                        **exec_result,
+                        "execution_time": round(time.time() - case_start, 3),
+                        "error": error,
+                        "passed": passed,
+                    })
+                    if stop_on_failure and not passed:
+                        break
             finally:
-                # Always cleanup container
-                try:
-                    container.stop(timeout=1)
-                except:
-                    pass
-                container.remove(force=True)
-                
-        except docker.errors.ImageNotFound:
+                with timings.phase("release"):
+                    backend.release(sandbox)
+        
+        except SandboxImageNotFound as e:
+            metrics.IMAGE_NOT_FOUND.inc(language=language)
             return {
-                "stdout": "",
-                "stderr": f"Docker image '{config.image}' not found. Pulling image...",
-                "exit_code": 1,
+                "results": results,
+                "passed": sum(result["passed"] for result in results),
+                "total": len(test_cases),
                 "execution_time": 0,
-                "error": "Image not found. Please try again after pulling the image."
-            }
-        except docker.errors.ContainerError as e:
-            return {
-                "stdout": "",
                 "stderr": str(e),
-                "exit_code": 1,
-                "execution_time": 0,
-                "error": "Runtime error"
+                "error": "Image not found. Please try again after pulling the image."
             }
         except Exception as e:
+            metrics.ERRORS.inc(language=language)
             return {
-                "stdout": "",
+                "results": results,
+                "passed": sum(result["passed"] for result in results),
+                "total": len(test_cases),
+                "execution_time": round(time.time() - start_time, 3),
                 "stderr": str(e),
-                "exit_code": 1,
-                "execution_time": 0,
                 "error": f"Execution failed: {str(e)}"
             }
+        
+        response = {
+            "results": results,
+            "passed": sum(result["passed"] for result in results),
+            "total": len(test_cases),
+            "execution_time": round(time.time() - start_time, 3),
+            "stderr": "",
+            "error": None,
+            "phases": timings.as_dict(),
+        }
+        for name, duration in response["phases"].items():
+            metrics.PHASE_SECONDS.observe(duration, language=language, phase=name)
+        return response
     
-    def get_supported_languages(self):
-        return get_supported_languages()
+    def _run_error(self, status: Dict[str, Any], config) -> Optional[str]:
+        if status["timed_out"]:
+            return f"Time limit exceeded ({config.timeout} seconds)"
+        if status.get("oom_killed"):
+            return f"Memory limit exceeded ({config.memory})"
+        return None
+    
+    def _count_failure(self, language: str, result: Dict[str, Any]):
+        if result.get("timed_out"):
+            metrics.TIMEOUTS.inc(language=language)
+        elif result.get("oom_killed"):
+            metrics.OOM_KILLS.inc(language=language)
+        elif result["error"] == "Compilation failed":
+            metrics.COMPILE_FAILURES.inc(language=language)
+    
+    def _record_metrics(self, language: str, result: Dict[str, Any], phases: Dict[str, float]):
+        metrics.EXECUTIONS.inc(language=language, cached="false")
+        for name, duration in phases.items():
+            metrics.PHASE_SECONDS.observe(duration, language=language, phase=name)
+        metrics.OVERHEAD_SECONDS.observe(result["overhead_time"], language=language)
+        if "exec" in phases:
+            self._record_usage(language, result, phases["exec"])
+    
+    def _record_usage(self, language: str, result: Dict[str, Any], wall_time: float):
+        if result.get("cpu_time") is not None:
+            metrics.USER_CPU_SECONDS.observe(result["cpu_time"], language=language)
+        if result.get("peak_memory") is not None:
+            metrics.PEAK_MEMORY_BYTES.observe(result["peak_memory"], language=language)
+        self.profiles.record(language, result.get("peak_memory"), result.get("cpu_time"), wall_time)
     
-    def cleanup(self):
-        """Clean up any dangling containers."""
+    def get_cached_result(
+        self, code: str, language: str, stdin: Optional[str] = None, files: Optional[Dict[str, bytes]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return a cached result without touching a sandbox, or None.
+        Cheap enough to call from the event loop before queueing a run.
+        """
+        if language not in get_supported_languages():
+            return None
+        cache_key = self._result_cache_key(language, get_language_config(language), code, stdin, files, resolve=False)
+        cached = self.result_cache.peek(cache_key) if cache_key else None
+        if cached is None:
+            return None
+        metrics.EXECUTIONS.inc(language=language, cached="true")
+        return {"stdout": cached["stdout"], "stderr": cached["stderr"], **cached["exit"], "cached": True}
+    
+    def _result_cache_key(
+        self, language: str, config, code: str, stdin: Optional[str], files: Optional[Dict[str, bytes]], resolve: bool = True
+    ) -> Optional[str]:
+        if self.result_cache is None or not config.cache_results:
+            return None
+        image_digest = self._backend(config).image_digest(config, resolve)
+        if image_digest is None:
+            return None
+        return ResultCache.key(language, image_digest, code, stdin, files)
+    
+    def _backend(self, config) -> SandboxBackend:
+        name = self.backend_override or config.backend
+        if name not in self.backends:
+            raise CodeExecutionError(f"Sandbox backend '{name}' is not configured")
+        return self.backends[name]
+    
+    def _workspace_files(
+        self, filename: str, code: str, files: Optional[Dict[str, bytes]], extra: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Project files plus the source file and our own input files, which must not be overwritten."""
+        workspace = dict(files or {})
         try:
-            # Remove any stopped containers from code execution
-            containers = self.client.containers.list(
-                all=True,
-                filters={"status": "exited"}
-            )
-            for container in containers:
-                try:
-                    container.remove()
-                except:
-                    pass
+            check_reserved(workspace, [filename, *extra])
+        except ValueError as e:
+            raise CodeExecutionError(str(e))
+        workspace[filename] = code
+        workspace.update(extra)
+        return workspace
+    
+    def _compile(self, sandbox, code: str, filename: str, config, files: Optional[Dict[str, bytes]] = None) -> Dict[str, Any]:
+        """Compile the uploaded source, reusing cached build output when possible."""
+        cache_key = ArtifactCache.key(code, config, files) if config.artifacts else None
+        if cache_key:
+            artifact = self.artifact_cache.get(cache_key)
+            if artifact is not None:
+                sandbox.put_archive(artifact)
+                return {"stdout": "", "stderr": "", "exit_code": 0, "error": None}
+        
+        compile_cmd = config.compile_cmd.format(file=filename)
+        exec_result = self._exec(sandbox, compile_cmd, config.timeout)
+        
+        if exec_result["timed_out"]:
+            return {**exec_result, "error": f"Compilation timed out after {config.timeout} seconds"}
+        
+        if exec_result["exit_code"] != 0:
+            return {**exec_result, "error": "Compilation failed"}
+        
+        if cache_key:
+            self._store_artifact(sandbox, cache_key, config)
+        
+        return {"stdout": "", "stderr": "", "exit_code": 0, "error": None}
+    
+    def _store_artifact(self, sandbox, cache_key: str, config):
+        try:
+            exit_code, archive = sandbox.run(f"tar -cf - {config.artifacts}")
+            if exit_code == 0 and archive:
+                self.artifact_cache.put(cache_key, archive)
+        except Exception as e:
+            logger.warning("Failed to cache compiled output: %s", e)
+    
+    def _exec(self, sandbox, cmd: str, timeout: float, max_output_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Run `cmd` to completion and collect its (bounded) output."""
+        output = {"stdout": [], "stderr": []}
+        stream = self._exec_stream(sandbox, cmd, timeout, max_output_bytes)
+        while True:
+            try:
+                name, text = next(stream)
+            except StopIteration as stop:
+                return {
+                    "stdout": "".join(output["stdout"]),
+                    "stderr": "".join(output["stderr"]),
+                    **stop.value,
+                }
+            output[name].append(text)
+    
+    def _exec_stream(
+        self, sandbox, cmd: str, timeout: float, max_output_bytes: Optional[int] = None
+    ) -> Generator[Tuple[str, str], None, Dict[str, Any]]:
+        """
+        Run `cmd` in the sandbox, killing it after `timeout` seconds.
+        Yields decoded output chunks until `max_output_bytes` (default: the
+        executor's limit) have been seen and returns the exit code and
+        timed_out / truncated flags.
+        """
+        max_output_bytes = max_output_bytes or self.max_output_bytes
+        process = sandbox.start(cmd)
+        
+        timed_out = threading.Event()
+        
+        def on_timeout():
+            timed_out.set()
+            process.kill()
+        
+        watchdog = threading.Timer(timeout, on_timeout)
+        watchdog.daemon = True
+        decoders = {
+            "stdout": codecs.getincrementaldecoder('utf-8')(errors='replace'),
+            "stderr": codecs.getincrementaldecoder('utf-8')(errors='replace'),
+        }
+        captured = 0
+        truncated = False
+        
+        watchdog.start()
+        try:
+            for name, chunk in process.output():
+                room = max_output_bytes - captured
+                captured += min(len(chunk), room)
+                if len(chunk) > room:
+                    truncated = True
+                text = decoders[name].decode(chunk[:room])
+                if text:
+                    yield name, text
+                if truncated:
+                    # Nobody will read the rest, so stop the program producing it
+                    process.kill()
+                    break
+        finally:
+            watchdog.cancel()
+        
+        for name, decoder in decoders.items():
+            text = decoder.decode(b"", final=True)
+            if text:
+                yield name, text
+        
+        exit_code = process.wait()
+        cpu_time = process.cpu_time()
+        peak_memory = process.peak_memory()
+        return {
+            "exit_code": exit_code,
+            "timed_out": timed_out.is_set(),
+            "truncated": truncated,
+            # The only other source of SIGKILL in a sandbox is the kernel OOM killer
+            "oom_killed": exit_code == 137 and not timed_out.is_set() and not truncated,
+            "cpu_time": round(cpu_time, 3) if cpu_time is not None else None,
+            "peak_memory": peak_memory,
+        }
+    
+    def open_sandbox(self, language: str):
+        """
+        Acquire a sandbox for `language` that outlives a single execution (a
+        REPL session). Run commands in it with run_in_sandbox() and hand it
+        back with close_sandbox().
+        """
+        config = get_language_config(language)
+        return self._backend(config).acquire(language, config)
+    
+    def run_in_sandbox(self, sandbox, cmd: str, timeout: float, max_output_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Run `cmd` in a sandbox from open_sandbox(), with the same timeout and output limits as an execution."""
+        return self._exec(sandbox, cmd, timeout, max_output_bytes)
+    
+    def close_sandbox(self, sandbox):
+        self._backend(sandbox.config).release(sandbox)
+    
+    def prepare(self, language: str):
+        """Make sure the sandbox backend has what `language` needs (e.g. pull its image)."""
+        config = get_language_config(language)
+        try:
+            self._backend(config).prepare(language, config)
         except Exception as e:
-            print(f"Cleanup error: {e}")
\ No newline at end of file
+            raise CodeExecutionError(f"Failed to prepare {language}: {e}")
+    
+    def warm_up(self, language: str) -> Dict[str, Any]:
+        """Run the language's sample program once so images and caches are hot."""
+        config = get_language_config(language)
+        result = self.execute(config.sample_code, language)
+        if result["error"] or result["exit_code"] != 0:
+            raise CodeExecutionError(f"Warm-up run for {language} failed: {result['error'] or result['stderr']}")
+        return result
+    
+    def get_supported_languages(self):
+        return get_supported_languages()
+    
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for backend in self.backends.values():
+            stats.update(backend.stats())
+        return stats
+    
+    def get_resource_profiles(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            language: self.profiles.profile(language, get_language_config(language))
+            for language in get_supported_languages()
+        }
+    
+    def get_cache_stats(self) -> Dict[str, Optional[Dict[str, int]]]:
+        return {
+            "result_cache": self.result_cache.stats() if self.result_cache else None,
+            "artifact_cache": self.artifact_cache.stats(),
+        }
+    
+    def shutdown(self):
+        """Release everything the backends hold (e.g. pooled containers)."""
+        for backend in self.backends.values():
+            backend.shutdown()
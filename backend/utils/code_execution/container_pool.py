@@ -0,0 +1,439 @@
+"""
+Pool of pre-warmed sandbox containers, one idle queue per language.
+Containers are created and cleaned in a background thread so that a request
+only pays for uploading the code and running it.
+"""
+import logging
+import io
+import os
+import time
+import uuid
+import socket
+import tarfile
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+from docker.types import Mount
+from utils.code_execution.language_config import get_language_config, get_supported_languages
+from utils.code_execution.timing import PhaseTimings
+from utils.numeric import parse_memory
+
+logger = logging.getLogger(__name__)
+
+
+# Every sandbox container carries these labels, so the reaper can find ours
+# without listing unrelated containers on the host
+LABEL_LANGUAGE = "interactive-labs.language"
+LABEL_OWNER = "interactive-labs.owner"
+LABEL_CREATED = "interactive-labs.created"
+
+# host:pid:token of this process; the token tells a restarted process that
+# reuses the same PID (e.g. PID 1 in a container) from its predecessor
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# Containers are reused by different users, so programs run unprivileged on a
+# read-only root filesystem: the workspace volume, /tmp and /dev/shm are the only
+# writable places, and the wipe (run as root) clears all three between runs
+SANDBOX_UID = 65534  # nobody
+SANDBOX_USER = f"{SANDBOX_UID}:{SANDBOX_UID}"
+TMP_SIZE = "64m"
+PIDS_LIMIT = 256
+
+# Durations kept per lifecycle phase (see ContainerPool.lifecycle_timings)
+LIFECYCLE_SAMPLES = 1000
+
+# The container's cgroup v2 counters, read as root after each run (see parse_usage)
+USAGE_CMD = "cat /sys/fs/cgroup/cpu.stat /sys/fs/cgroup/memory.peak 2>/dev/null"
+
+# Also hands the workspace (a root-owned volume when created) to the sandbox user,
+# then prints the cgroup usage the next run is measured against
+WORKSPACE_WIPE_CMD = (
+    "sh -c 'kill -9 -1 2>/dev/null; "
+    "rm -rf /workspace/* /workspace/.[!.]* /workspace/..?* "
+    "/tmp/* /tmp/.[!.]* /tmp/..?* /dev/shm/* /dev/shm/.[!.]* 2>/dev/null; "
+    f"chown {SANDBOX_USER} /workspace && chmod 755 /workspace && {{ {USAGE_CMD}; true; }}'"
+)
+
+
+def parse_usage(output: bytes) -> Tuple[Optional[float], Optional[int]]:
+    """
+    CPU seconds and peak memory (bytes) of the container's cgroup so far, from
+    USAGE_CMD output; None where the host does not expose them (cgroup v1).
+    """
+    cpu = memory = None
+    for line in (output or b"").decode(errors="replace").splitlines():
+        fields = line.split()
+        if len(fields) == 2 and fields[0] == "usage_usec" and fields[1].isdigit():
+            cpu = int(fields[1]) / 1e6
+        elif len(fields) == 1 and fields[0].isdigit():
+            memory = int(fields[0])
+    return cpu, memory
+
+
+ZYGOTE_DIR = os.path.join(os.path.dirname(__file__), "zygote")
+# Runs a file through the container's zygote instead of a fresh interpreter
+ZYGOTE_RUN_CMD = "sh /zygote/run.sh {file}"
+
+
+@functools.lru_cache(maxsize=None)
+def _zygote_archive(driver: str) -> bytes:
+    """
+    Contents of a container's /zygote volume: the driver, the run.sh client and
+    the ctl FIFO they talk over. Only the FIFO belongs to the sandbox user.
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name in (driver, "run.sh"):
+            tar.add(os.path.join(ZYGOTE_DIR, name), arcname=name, filter=_root_owned)
+        # Created up front, so a run submitted before the zygote is up waits for it
+        fifo = tarfile.TarInfo("ctl")
+        fifo.type = tarfile.FIFOTYPE
+        fifo.mode = 0o600
+        fifo.uid = fifo.gid = SANDBOX_UID
+        tar.addfile(fifo)
+    return buffer.getvalue()
+
+
+def _root_owned(info: tarfile.TarInfo) -> tarfile.TarInfo:
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    info.mode = 0o644
+    return info
+
+
+def _empty_stats() -> Dict[str, int]:
+    return {"hits": 0, "misses": 0, "created": 0, "recycled": 0}
+
+
+class ContainerPool:
+    """
+    Keeps between `min_size` and `max_size` idle containers per language.
+    Containers are retired after `max_uses` runs or `max_age` seconds, and
+    once their language's settings are reloaded (e.g. a new memory limit).
+    With `zygote`, languages that have a zygote_driver run it as the
+    container's main process (see utils/code_execution/zygote/).
+    """
+
+    def __init__(
+        self,
+        client,
+        min_size: int = 1,
+        max_size: int = 4,
+        max_uses: int = 50,
+        max_age: float = 3600,
+        refill_interval: float = 5.0,
+        languages: Optional[List[str]] = None,
+        zygote: bool = False,
+    ):
+        self.client = client
+        self.languages = languages if languages is not None else get_supported_languages()
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.refill_interval = refill_interval
+        self.zygote = zygote
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._idle = {language: deque() for language in self.languages}
+        self._dirty = deque()
+        self._uses = {}
+        self._created = {}
+        self._configs = {}  # Settings each container was created with
+        self._usage = {}  # Cgroup usage after each container's last wipe (see parse_usage)
+        self._zygotes = set()  # Containers whose main process is a zygote
+        self._lifecycle = {}  # Phase -> recent durations of create, start, wipe and remove
+        self._stats = {
+            language: _empty_stats() for language in self.languages
+        }
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._maintain, name="container-pool", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Stop the refill thread and remove every container owned by the pool."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+        with self._lock:
+            containers = [container for idle in self._idle.values() for container in idle]
+            containers += [container for _, container in self._dirty]
+            for idle in self._idle.values():
+                idle.clear()
+            self._dirty.clear()
+
+        for container in containers:
+            self._remove(container)
+
+    def acquire(self, language: str, timings: Optional[PhaseTimings] = None):
+        """Return a running container for `language`, creating one on a pool miss."""
+        with self._lock:
+            idle = self._idle.setdefault(language, deque())
+            stats = self._stats.setdefault(language, _empty_stats())
+            stale = []
+            container = None
+            while idle:
+                candidate = idle.popleft()
+                if self._stale(language, candidate):
+                    self._forget(candidate)
+                    stats["recycled"] += 1
+                    stale.append(candidate)
+                    continue
+                container = candidate
+                break
+            stats["hits" if container is not None else "misses"] += 1
+
+        for candidate in stale:
+            self._remove(candidate)
+        if container is not None:
+            return container
+        self._wakeup.set()
+        return self._create(language, timings)
+
+    def release(self, language: str, container):
+        """Hand a used container back; it is wiped or recycled in the background."""
+        if self._stopped.is_set() or self.max_size == 0:
+            # Nothing to return it to: remove it now (this is what `--no-pool` benchmarks measure)
+            self.discard(language, container)
+            return
+        with self._lock:
+            self._dirty.append((language, container))
+        self._wakeup.set()
+
+    def discard(self, language: str, container):
+        """Drop a container that must not be reused (e.g. it failed mid-run)."""
+        with self._lock:
+            self._forget(container)
+            self._stats.setdefault(language, _empty_stats())["recycled"] += 1
+        self._remove(container)
+
+    def has_zygote(self, container) -> bool:
+        """Whether runs in the container should go through its zygote."""
+        with self._lock:
+            return container.id in self._zygotes
+
+    def usage(self, container) -> Tuple[Optional[float], Optional[int]]:
+        """CPU seconds and peak memory the container had used when it was last wiped."""
+        with self._lock:
+            return self._usage.get(container.id, (None, None))
+
+    def unused(self, container) -> bool:
+        """Whether the container has not been handed back since it was created."""
+        with self._lock:
+            return self._uses.get(container.id) == 0
+
+    def owns(self, container_id: str) -> bool:
+        """Whether the container is idle in or checked out of this pool."""
+        with self._lock:
+            return container_id in self._uses
+
+    def wake(self):
+        """Run a refill pass now instead of at the next interval."""
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                language: {**counters, "idle": len(self._idle.get(language, ()))}
+                for language, counters in self._stats.items()
+            }
+
+    def lifecycle_timings(self, clear: bool = False) -> Dict[str, List[float]]:
+        """
+        Recent durations (seconds) of the container lifecycle phases, whether
+        they ran in a request (a pool miss, or removal without a pool) or in
+        the background: create, start (including the first wipe), wipe and
+        remove. There is no separate stop: removal is forced, which kills
+        the container as part of the same call.
+        """
+        with self._lock:
+            timings = {phase: list(durations) for phase, durations in self._lifecycle.items()}
+            if clear:
+                self._lifecycle.clear()
+        return timings
+
+    @contextmanager
+    def _phase(self, name: str, timings: Optional[PhaseTimings] = None):
+        """Time a lifecycle phase, also into the request's `timings` if it runs in one."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            if timings is not None:
+                timings.add(name, duration)
+            with self._lock:
+                self._lifecycle.setdefault(name, deque(maxlen=LIFECYCLE_SAMPLES)).append(duration)
+
+    def _create(self, language: str, timings: Optional[PhaseTimings] = None):
+        config = get_language_config(language)
+        zygote = self.zygote and bool(config.zygote_driver)
+        command = "tail -f /dev/null"
+        if zygote:
+            # PID 1, so the workspace wipe (kill -9 -1) leaves it running
+            command = config.zygote_cmd.format(
+                driver=f"/zygote/{config.zygote_driver}",
+                timeout=config.timeout,
+                memory=parse_memory(config.memory),
+            )
+        # Anonymous volumes rather than tmpfs mounts: put_archive cannot write into a tmpfs
+        mounts = [Mount("/workspace", None, type="volume")]
+        if zygote:
+            mounts.append(Mount("/zygote", None, type="volume"))
+        with self._phase("create", timings):
+            container = self.client.containers.create(
+                image=config.image,
+                command=command,
+                network_mode="none",
+                mem_limit=config.memory,
+                cpu_period=config.cpu_period,
+                cpu_quota=config.cpu_quota,
+                pids_limit=PIDS_LIMIT,
+                working_dir="/workspace",
+                user=SANDBOX_USER,
+                environment={"HOME": "/tmp"},
+                read_only=True,
+                mounts=mounts,
+                tmpfs={"/tmp": f"size={TMP_SIZE},mode=1777"},
+                security_opt=["no-new-privileges"],
+                labels={
+                    LABEL_LANGUAGE: language,
+                    LABEL_OWNER: OWNER_ID,
+                    LABEL_CREATED: str(int(time.time())),
+                },
+            )
+        try:
+            if zygote:
+                container.put_archive("/zygote", _zygote_archive(config.zygote_driver))
+            with self._phase("start", timings):
+                container.start()
+                result = container.exec_run(WORKSPACE_WIPE_CMD, user="root", workdir="/")
+            if result.exit_code != 0:
+                raise RuntimeError(f"Failed to prepare the workspace of container {container.id}")
+        except Exception:
+            self._remove(container)
+            raise
+
+        with self._lock:
+            self._uses[container.id] = 0
+            self._created[container.id] = time.monotonic()
+            self._configs[container.id] = config
+            self._usage[container.id] = parse_usage(result.output)
+            if zygote:
+                self._zygotes.add(container.id)
+            self._stats[language]["created"] += 1
+        return container
+
+    def _forget(self, container):
+        """Stop tracking a container. Caller holds the lock."""
+        self._uses.pop(container.id, None)
+        self._created.pop(container.id, None)
+        self._configs.pop(container.id, None)
+        self._usage.pop(container.id, None)
+        self._zygotes.discard(container.id)
+
+    def _expired(self, container) -> bool:
+        """Caller holds the lock."""
+        return time.monotonic() - self._created.get(container.id, 0) >= self.max_age
+
+    def _stale(self, language: str, container) -> bool:
+        """Whether the language's settings changed since the container was created. Caller holds the lock."""
+        try:
+            return self._configs.get(container.id) is not get_language_config(language)
+        except ValueError:
+            return True  # Language was removed
+
+    def _remove(self, container):
+        try:
+            # v=True: the workspace and zygote volumes go with the container
+            with self._phase("remove"):
+                container.remove(force=True, v=True)
+        except Exception as e:
+            logger.warning("Container pool: failed to remove container %s: %s", container.id, e)
+
+    def _recycle_or_return(self, language: str, container):
+        with self._lock:
+            uses = self._uses.get(container.id, 0) + 1
+            self._uses[container.id] = uses
+            keep = (
+                uses < self.max_uses
+                and not self._expired(container)
+                and not self._stale(language, container)
+                and len(self._idle[language]) < self.max_size
+            )
+
+        if keep:
+            try:
+                with self._phase("wipe"):
+                    result = container.exec_run(WORKSPACE_WIPE_CMD, user="root", workdir="/")
+                keep = result.exit_code == 0
+                usage = parse_usage(result.output)
+            except Exception as e:
+                logger.warning("Container pool: failed to wipe container %s: %s", container.id, e)
+                keep = False
+
+        with self._lock:
+            if keep and not self._stopped.is_set():
+                self._usage[container.id] = usage
+                self._idle[language].append(container)
+                return
+            self._forget(container)
+            self._stats[language]["recycled"] += 1
+        self._remove(container)
+
+    def _retire_expired(self):
+        """Remove idle containers older than `max_age` or created with outdated settings."""
+        expired = []
+        with self._lock:
+            for language, idle in self._idle.items():
+                for container in [c for c in idle if self._expired(c) or self._stale(language, c)]:
+                    idle.remove(container)
+                    self._forget(container)
+                    self._stats[language]["recycled"] += 1
+                    expired.append(container)
+        for container in expired:
+            self._remove(container)
+
+    def _maintain(self):
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+
+            while not self._stopped.is_set():
+                with self._lock:
+                    if not self._dirty:
+                        break
+                    language, container = self._dirty.popleft()
+                self._recycle_or_return(language, container)
+
+            self._retire_expired()
+
+            supported = get_supported_languages()
+            for language in self.languages:
+                if language not in supported:
+                    continue  # Removed from the languages file
+                while not self._stopped.is_set():
+                    with self._lock:
+                        if len(self._idle[language]) >= self.min_size:
+                            break
+                    try:
+                        container = self._create(language)
+                    except Exception as e:
+                        logger.warning("Container pool: failed to warm a '%s' container: %s", language, e)
+                        break
+                    with self._lock:
+                        self._idle[language].append(container)
+
+            self._wakeup.wait(self.refill_interval)
@@ -0,0 +1,128 @@
+"""
+Background reaper for sandbox containers leaked by crashed or restarted
+processes. It only looks at containers carrying the pool's labels and removes
+the leaked, orphaned or over-age ones it found, never a container that a live
+process may still be starting.
+"""
+import logging
+import os
+import time
+import socket
+import threading
+from typing import Callable, Dict, Any, Optional
+from utils.code_execution import metrics
+from utils.code_execution.container_pool import LABEL_CREATED, LABEL_OWNER, OWNER_ID
+
+logger = logging.getLogger(__name__)
+
+# Longer than any container takes from create to start (and to being tracked
+# by its pool), so a sandbox still being set up is never mistaken for a leak
+OWN_GRACE_PERIOD = 60
+
+
+def _owner_alive(owner: str) -> Optional[bool]:
+    """True/False when the owner process runs on this machine, None when that cannot be told."""
+    try:
+        hostname, pid, token = owner.split(":")
+        pid = int(pid)
+    except ValueError:
+        return False  # Label from something that is not one of our processes
+    if hostname != socket.gethostname():
+        return None
+    if pid == os.getpid():
+        return owner == OWNER_ID
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ContainerReaper:
+    """
+    Every `interval` seconds, reclaims labelled containers that are:
+      - owned by this process but no longer tracked by its pool (leaked),
+      - owned by a process on this machine that has exited (orphaned),
+      - older than `max_age` seconds, whoever owns them (e.g. a crashed
+        worker on another machine); pools retire their own containers well
+        before this, so a live owner is not affected.
+    """
+
+    def __init__(self, client, owns: Callable[[str], bool], max_age: float = 7200, interval: float = 60):
+        self.client = client
+        self.owns = owns
+        self.max_age = max_age
+        self.interval = interval
+
+        self._stopped = threading.Event()
+        self._thread = None
+        self._totals = {"reaped": 0}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="container-reaper", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._totals)
+
+    def reap(self) -> Dict[str, Any]:
+        """Run one pass and report what was reclaimed."""
+        containers = self.client.containers.list(all=True, filters={"label": LABEL_OWNER})
+        now = time.time()
+
+        counts = {}
+        for container in containers:
+            reason = self._reason(container, now)
+            if reason is None:
+                continue
+            try:
+                # Kills it if needed; v=True also drops its anonymous /workspace volume
+                container.remove(force=True, v=True)
+            except Exception as e:
+                logger.warning("Container reaper: failed to remove container %s: %s", container.id, e)
+                continue
+            counts[reason] = counts.get(reason, 0) + 1
+            metrics.REAPED_CONTAINERS.inc(reason=reason)
+
+        reaped = sum(counts.values())
+        self._totals["reaped"] += reaped
+        if reaped:
+            logger.info("Container reaper: removed %d containers %s", reaped, counts)
+        return {"reaped": reaped, "reasons": counts}
+
+    def _reason(self, container, now: float) -> Optional[str]:
+        labels = container.labels or {}
+        owner = labels.get(LABEL_OWNER, "")
+        try:
+            age = now - int(labels.get(LABEL_CREATED, "0"))
+        except ValueError:
+            age = now
+
+        if owner == OWNER_ID:
+            if age >= OWN_GRACE_PERIOD and not self.owns(container.id):
+                return "leaked"
+            return None
+        if _owner_alive(owner) is False:
+            return "orphaned"
+        if age >= self.max_age:
+            return "over_age"
+        return None
+
+    def _loop(self):
+        # First pass right away: picks up whatever a previous run left behind
+        while not self._stopped.is_set():
+            try:
+                self.reap()
+            except Exception:
+                logger.exception("Container reaper error")
+            self._stopped.wait(self.interval)
@@ -0,0 +1,300 @@
+"""
+Async front for CodeExecutor.
+Runs executions in a dedicated thread pool so the event loop never blocks, and
+bounds both the number of concurrent sandboxes and the number of waiting requests.
+Waiting runs are admitted per user in weighted fair order (see FairScheduler),
+and with memory / CPU budgets set, only once what their language actually
+uses (see ResourceProfiles) fits in what the running ones reserved.
+"""
+import math
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
+from utils.code_execution.code_executer import CodeExecutor, CodeExecutionError
+from utils.code_execution.language_config import get_language_config
+from utils.code_execution.fair_scheduler import CpuQuota, FairScheduler, Principal, Ticket
+from utils.code_execution import metrics
+
+
+class ExecutionQueueFullError(CodeExecutionError):
+    """Raised when no sandbox slot is free and the wait queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Code execution queue is full. Please retry later.")
+        self.retry_after = retry_after
+
+
+class ExecutionQuotaExceededError(CodeExecutionError):
+    """Raised when a user has used up their CPU time for the current window."""
+
+    def __init__(self, quota: float, window: float, retry_after: int):
+        super().__init__(f"CPU time quota exceeded ({quota:g} seconds per {window:g} seconds). Please retry later.")
+        self.retry_after = retry_after
+
+
+# Charged to callers that do not say who they are
+ANONYMOUS = Principal("anonymous")
+
+
+class ExecutionService:
+    def __init__(
+        self,
+        executor: CodeExecutor,
+        max_concurrency: int = 4,
+        max_queue_size: int = 16,
+        queue_timeout: float = 30.0,
+        memory_budget: Optional[int] = None,
+        cpu_budget: Optional[float] = None,
+        max_queued_per_user: Optional[int] = None,
+        quota_window: float = 3600,
+    ):
+        """
+        `memory_budget` (bytes) and `cpu_budget` (cores) cap the sum of the
+        reservations of running executions; None leaves only `max_concurrency`.
+        `max_queued_per_user` stops one user from filling the whole queue.
+        """
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.memory_budget = memory_budget
+        self.cpu_budget = cpu_budget
+        self.max_queued_per_user = max_queued_per_user
+
+        self._thread_pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="code-execution")
+        self._scheduler = FairScheduler()
+        self._quota = CpuQuota(window=quota_window)
+        self._queued_by_user = {}
+        self._reserved_memory = 0
+        self._reserved_cpu = 0.0
+        self._waiting = 0
+        self._running = 0
+        self._avg_duration = 1.0
+
+    async def execute(self, principal: Principal = ANONYMOUS, **kwargs) -> Dict[str, Any]:
+        """Run `CodeExecutor.execute(**kwargs)` for `principal` once a sandbox slot is free."""
+        # Cached results skip the queue entirely
+        cached = self.executor.get_cached_result(**kwargs)
+        if cached is not None:
+            return cached
+        result = await self._call(self.executor.execute, principal, kwargs)
+        self.charge(principal, result)
+        return result
+
+    async def execute_batch(self, principal: Principal = ANONYMOUS, **kwargs) -> Dict[str, Any]:
+        """Run `CodeExecutor.execute_batch(**kwargs)`; the batch holds a single slot."""
+        result = await self._call(self.executor.execute_batch, principal, kwargs, cost=len(kwargs["test_cases"]) or 1)
+        for case in result["results"]:
+            self.charge(principal, case)
+        return result
+
+    async def call(self, method, principal: Principal = ANONYMOUS, **kwargs) -> Dict[str, Any]:
+        """
+        Run `method(**kwargs)` for `principal` once a slot is free, for sandbox
+        runs that do not go through CodeExecutor (e.g. a session snippet, whose
+        sandbox is already held). The result is charged like execute()'s; without
+        a cpu_time (sessions cannot tell the snippet's from the rest) that is its
+        wall-clock time.
+        """
+        result = await self._call(method, principal, kwargs)
+        self.charge(principal, result)
+        return result
+
+    async def _call(self, method, principal: Principal, kwargs: Dict[str, Any], cost: float = 1.0) -> Dict[str, Any]:
+        ticket = await self._acquire_slot(principal, kwargs.get("language"), cost)
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        try:
+            return await loop.run_in_executor(
+                self._thread_pool, functools.partial(method, **kwargs)
+            )
+        finally:
+            self._release_slot(ticket, loop.time() - start_time)
+
+    def stream(self, principal: Principal = ANONYMOUS, **kwargs) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Return an async iterator over `CodeExecutor.execute_stream(**kwargs)`
+        events. A run that would be refused right now (quota used up, queue
+        full) raises here, so callers can still answer with an error status.
+        The slot is taken once iteration starts and released when the run has
+        finished, even if the iterator is closed before that.
+        """
+        self._check_admission(principal)
+        return self._stream_events(principal, kwargs)
+
+    async def _stream_events(self, principal: Principal, kwargs: Dict[str, Any]) -> AsyncIterator[Tuple[str, Any]]:
+        ticket = await self._acquire_slot(principal, kwargs.get("language"))
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        events = asyncio.Queue()
+        cancelled = threading.Event()
+        done = object()
+        outcome = {}
+
+        def produce():
+            stream = self.executor.execute_stream(**kwargs)
+            try:
+                for event in stream:
+                    if event[0] == "exit":
+                        outcome["result"] = event[1]
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+                    if cancelled.is_set():
+                        break
+            finally:
+                # Closing the generator hands the container back to the pool
+                stream.close()
+                loop.call_soon_threadsafe(events.put_nowait, done)
+
+        def finished(_=None):
+            # The sandbox is only free once the worker thread is done with it,
+            # which is after the consumer left if the client disconnected
+            if outcome.get("released"):
+                return
+            outcome["released"] = True
+            if "result" in outcome:
+                self.charge(principal, outcome["result"])
+            self._release_slot(ticket, loop.time() - start_time)
+
+        producer = loop.run_in_executor(self._thread_pool, produce)
+        producer.add_done_callback(finished)
+        try:
+            while True:
+                event = await events.get()
+                if event is done:
+                    break
+                yield event
+            await producer
+        finally:
+            cancelled.set()
+            if producer.done():
+                finished()
+
+    def _estimate(self, language: Optional[str]) -> Tuple[int, float]:
+        if self.memory_budget is None and self.cpu_budget is None:
+            return 0, 0.0
+        try:
+            config = get_language_config(language)
+        except ValueError:
+            return 0, 0.0  # The executor reports the unsupported language
+        return self.executor.profiles.estimate(language, config)
+
+    def _fits(self, ticket: Ticket) -> bool:
+        if self._running >= self.max_concurrency:
+            return False
+        if self._running == 0:
+            return True  # Always admit one run, even if it alone exceeds a budget
+        if self.memory_budget is not None and self._reserved_memory + ticket.memory > self.memory_budget:
+            return False
+        if self.cpu_budget is not None and self._reserved_cpu + ticket.cpu > self.cpu_budget:
+            return False
+        return True
+
+    def _dispatch(self):
+        """Start every waiting run that fits now, in fair order."""
+        for ticket in self._scheduler.admit(self._fits):
+            self._running += 1
+            self._reserved_memory += ticket.memory
+            self._reserved_cpu += ticket.cpu
+            ticket.future.set_result(None)
+        self._update_gauges()
+
+    def check_quota(self, principal: Principal):
+        """Raise ExecutionQuotaExceededError if `principal` has used up its CPU time."""
+        if principal.cpu_quota is None:
+            return
+        if self._quota.used(principal.key) >= principal.cpu_quota:
+            raise ExecutionQuotaExceededError(
+                principal.cpu_quota,
+                self._quota.window,
+                self._quota.retry_after(principal.key, principal.cpu_quota),
+            )
+
+    def charge(self, principal: Principal, result: Dict[str, Any]):
+        """Count a finished run's CPU time against `principal`'s quota."""
+        # Wall-clock time stands in when the backend cannot measure CPU time
+        seconds = result.get("cpu_time")
+        if seconds is None:
+            seconds = result.get("execution_time") or 0
+        self._quota.charge(principal.key, seconds)
+
+    def _check_admission(self, principal: Principal):
+        """Raise if `principal` may not queue another run right now."""
+        self.check_quota(principal)
+        if self._waiting + self._running >= self.max_concurrency + self.max_queue_size:
+            raise ExecutionQueueFullError(self.retry_after())
+        queued = self._queued_by_user.get(principal.key, 0)
+        if self.max_queued_per_user is not None and queued >= self.max_queued_per_user:
+            raise ExecutionQueueFullError(self.retry_after())
+
+    async def _acquire_slot(self, principal: Principal, language: Optional[str], cost: float = 1.0) -> Ticket:
+        """Queue the run in fair order and wait until it is admitted; returns its ticket."""
+        self._check_admission(principal)
+        queued = self._queued_by_user.get(principal.key, 0)
+
+        memory, cpu = self._estimate(language)
+        ticket = self._scheduler.enqueue(principal, cost, memory, cpu)
+        self._waiting += 1
+        self._queued_by_user[principal.key] = queued + 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(ticket)
+            raise ExecutionQueueFullError(self.retry_after())
+        except asyncio.CancelledError:
+            self._abandon(ticket)
+            raise
+        finally:
+            self._waiting -= 1
+            remaining = self._queued_by_user[principal.key] - 1
+            if remaining:
+                self._queued_by_user[principal.key] = remaining
+            else:
+                del self._queued_by_user[principal.key]
+            self._update_gauges()
+        return ticket
+
+    def _abandon(self, ticket: Ticket):
+        if ticket.future.done():
+            # Admitted just as the wait ended: hand the slot straight back
+            self._release_slot(ticket, 0.0)
+        else:
+            self._scheduler.remove(ticket)
+            ticket.future.cancel()
+
+    def _release_slot(self, ticket: Ticket, duration: float):
+        self._running -= 1
+        self._reserved_memory -= ticket.memory
+        self._reserved_cpu -= ticket.cpu
+        self._dispatch()
+        # Exponentially weighted average, used to estimate Retry-After
+        self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+    def _update_gauges(self):
+        metrics.IN_FLIGHT.set(self._running)
+        metrics.QUEUE_DEPTH.set(self._waiting)
+        metrics.RESERVED_MEMORY.set(self._reserved_memory)
+        metrics.RESERVED_CPU.set(self._reserved_cpu)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is expected to drain."""
+        waves = (self._waiting + self._running) / self.max_concurrency
+        return max(1, math.ceil(waves * self._avg_duration))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "queued": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue_size": self.max_queue_size,
+            "reserved_memory": self._reserved_memory,
+            "memory_budget": self.memory_budget,
+            "reserved_cpu": round(self._reserved_cpu, 3),
+            "cpu_budget": self.cpu_budget,
+            "queued_by_user": dict(self._queued_by_user),
+        }
+
+    def shutdown(self):
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,102 @@
+"""
+Builds code execution components from application settings, so the API
+and the job workers configure them the same way.
+"""
+from typing import Dict, List, Optional
+from core.config import settings
+from utils.code_execution.code_executer import CodeExecutor, CodeExecutionError
+from utils.code_execution.language_config import get_language_config, get_supported_languages, use_languages_file
+from utils.code_execution.sandbox import (
+    DockerBackend,
+    FakeBackend,
+    LocalBackend,
+    MultiHostDockerBackend,
+    SandboxBackend,
+    SandboxError,
+)
+from utils.code_execution.result_cache import ResultCache, InMemoryResultCacheBackend
+from utils.code_execution.resource_profiles import ResourceProfiles
+from utils.code_execution.jobs import SQLiteJobQueue
+
+
+def create_executor() -> CodeExecutor:
+    if settings.CODE_EXECUTION_LANGUAGES_FILE:
+        try:
+            use_languages_file(settings.CODE_EXECUTION_LANGUAGES_FILE)
+        except ValueError as e:
+            raise CodeExecutionError(str(e))
+
+    result_cache = None
+    if settings.CODE_EXECUTION_RESULT_CACHE_SIZE > 0:
+        result_cache = ResultCache(
+            InMemoryResultCacheBackend(max_entries=settings.CODE_EXECUTION_RESULT_CACHE_SIZE),
+            ttl=settings.CODE_EXECUTION_RESULT_CACHE_TTL,
+        )
+
+    backend_override = settings.CODE_EXECUTION_BACKEND or None
+    return CodeExecutor(
+        backends=create_backends(backend_override),
+        max_output_bytes=settings.CODE_EXECUTION_MAX_OUTPUT_BYTES,
+        artifact_cache_size=settings.CODE_EXECUTION_ARTIFACT_CACHE_SIZE,
+        result_cache=result_cache,
+        backend_override=backend_override,
+        profiles=ResourceProfiles(
+            window=settings.CODE_EXECUTION_PROFILE_WINDOW,
+            headroom=settings.CODE_EXECUTION_PROFILE_HEADROOM,
+        ),
+    )
+
+
+def create_backends(backend_override: Optional[str] = None) -> Dict[str, SandboxBackend]:
+    """Create only the backends some language is configured to use."""
+    languages_by_backend = {}
+    for language in get_supported_languages():
+        config = get_language_config(language)
+        languages_by_backend.setdefault(backend_override or config.backend, []).append(language)
+
+    backends = {}
+    try:
+        for name, languages in languages_by_backend.items():
+            if name == "docker":
+                backends[name] = create_docker_backend(languages)
+            elif name == "local":
+                backends[name] = LocalBackend(isolate_network=settings.CODE_EXECUTION_LOCAL_ISOLATE_NETWORK)
+            elif name == "fake":
+                backends[name] = FakeBackend(latency=settings.CODE_EXECUTION_FAKE_LATENCY)
+            else:
+                raise CodeExecutionError(f"Unknown sandbox backend '{name}'")
+    except SandboxError as e:
+        for backend in backends.values():
+            backend.shutdown()
+        raise CodeExecutionError(str(e))
+    return backends
+
+
+def create_docker_backend(languages: List[str]) -> SandboxBackend:
+    pool_options = {
+        "pool_min_size": settings.CODE_EXECUTION_POOL_MIN_SIZE,
+        "pool_max_size": settings.CODE_EXECUTION_POOL_MAX_SIZE,
+        "pool_max_uses": settings.CODE_EXECUTION_POOL_MAX_USES,
+        "languages": languages,
+        "container_max_age": settings.CODE_EXECUTION_CONTAINER_MAX_AGE,
+        "reaper_interval": settings.CODE_EXECUTION_REAPER_INTERVAL,
+        "zygote": settings.CODE_EXECUTION_ZYGOTE,
+    }
+    hosts = [url.strip() for url in settings.CODE_EXECUTION_DOCKER_HOSTS.split(",") if url.strip()]
+    if not hosts:
+        return DockerBackend(**pool_options)
+    return MultiHostDockerBackend(
+        hosts,
+        max_concurrency_per_host=settings.CODE_EXECUTION_HOST_MAX_CONCURRENCY,
+        health_interval=settings.CODE_EXECUTION_HOST_HEALTH_INTERVAL,
+        acquire_timeout=settings.CODE_EXECUTION_QUEUE_TIMEOUT,
+        **pool_options,
+    )
+
+
+def create_job_queue() -> SQLiteJobQueue:
+    return SQLiteJobQueue(
+        settings.CODE_EXECUTION_JOB_DB_PATH,
+        stale_after=settings.CODE_EXECUTION_JOB_STALE_AFTER,
+        result_ttl=settings.CODE_EXECUTION_JOB_RESULT_TTL,
+    )
@@ -0,0 +1,128 @@
+"""
+Per-user fair queueing for sandbox slots.
+Waiting executions are ordered by lane (staff before everyone else), then by
+a start-time fair queueing tag, so each user gets a share of the sandboxes
+proportional to their weight however many requests they queue. CPU time is
+also capped per user over a sliding window.
+"""
+import time
+import heapq
+import asyncio
+import itertools
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+STAFF_LANE = 0
+DEFAULT_LANE = 1
+
+
+class Principal:
+    """Who an execution is charged to."""
+
+    def __init__(self, key: str, lane: int = DEFAULT_LANE, weight: float = 1.0, cpu_quota: Optional[float] = None):
+        self.key = key  # "user:<id>" or "ip:<address>"
+        self.lane = lane
+        self.weight = weight
+        self.cpu_quota = cpu_quota  # CPU seconds per quota window; None is unlimited
+
+
+class Ticket:
+    def __init__(self, principal: Principal, tag: float, seq: int, memory: int, cpu: float):
+        self.principal = principal
+        self.tag = tag
+        self.seq = seq
+        self.memory = memory
+        self.cpu = cpu
+        self.future = asyncio.get_running_loop().create_future()
+
+    def order(self):
+        return (self.principal.lane, self.tag, self.seq)
+
+    def __lt__(self, other: "Ticket") -> bool:
+        return self.order() < other.order()
+
+
+class FairScheduler:
+    """
+    Start-time fair queueing: a ticket's tag is
+    max(virtual time, the user's previous finish tag) + cost / weight,
+    and virtual time advances to the tag of each admitted ticket. Not thread
+    safe; use it from the event loop only.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._finish = {}  # user key -> finish tag of their last queued ticket
+        self._vtime = 0.0
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def enqueue(self, principal: Principal, cost: float = 1.0, memory: int = 0, cpu: float = 0.0) -> Ticket:
+        start = max(self._vtime, self._finish.get(principal.key, 0.0))
+        finish = start + cost / principal.weight
+        self._finish[principal.key] = finish
+        ticket = Ticket(principal, finish, next(self._seq), memory, cpu)
+        heapq.heappush(self._heap, ticket)
+        return ticket
+
+    def remove(self, ticket: Ticket):
+        """Drop a ticket that stopped waiting (timed out or cancelled)."""
+        try:
+            self._heap.remove(ticket)
+        except ValueError:
+            return
+        heapq.heapify(self._heap)
+
+    def admit(self, fits: Callable[[Ticket], bool]) -> List[Ticket]:
+        """Pop tickets in order while the next one fits; the first that does not fit blocks the rest."""
+        admitted = []
+        while self._heap and fits(self._heap[0]):
+            ticket = heapq.heappop(self._heap)
+            self._vtime = max(self._vtime, ticket.tag)
+            admitted.append(ticket)
+        if not self._heap:
+            # Nobody is waiting, so past finish tags no longer matter
+            self._finish.clear()
+        return admitted
+
+
+class CpuQuota:
+    """CPU seconds charged per user over a sliding window."""
+
+    def __init__(self, window: float = 3600):
+        self.window = window
+        self._usage = {}  # user key -> deque of (timestamp, seconds)
+
+    def used(self, key: str) -> float:
+        return sum(seconds for _, seconds in self._expire(key))
+
+    def charge(self, key: str, seconds: float):
+        if seconds > 0:
+            self._usage.setdefault(key, deque()).append((time.monotonic(), seconds))
+
+    def retry_after(self, key: str, quota: float) -> int:
+        """Seconds until enough usage leaves the window to get back under `quota`."""
+        usage = self._expire(key)
+        excess = sum(seconds for _, seconds in usage) - quota
+        now = time.monotonic()
+        for timestamp, seconds in usage:
+            excess -= seconds
+            if excess < 0:
+                return max(1, int(timestamp + self.window - now) + 1)
+        return 1
+
+    def _expire(self, key: str) -> deque:
+        usage = self._usage.get(key)
+        if usage is None:
+            return deque()
+        cutoff = time.monotonic() - self.window
+        while usage and usage[0][0] < cutoff:
+            usage.popleft()
+        if not usage:
+            del self._usage[key]
+        return usage
+
+    def stats(self) -> Dict[str, float]:
+        return {key: round(self.used(key), 3) for key in list(self._usage)}
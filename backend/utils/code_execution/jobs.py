@@ -0,0 +1,232 @@
+"""
+Durable queue of code execution jobs.
+The API process submits jobs and reads their results; separate worker
+processes (see utils/code_execution/worker.py) claim and execute them.
+Each job records the Principal it runs for: workers claim in fair order
+across principals, and the API charges finished jobs to their CPU quota.
+"""
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from utils.code_execution.fair_scheduler import Principal
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    FINISHED = (COMPLETED, FAILED)
+
+
+class JobQueue:
+    """Interface shared by queue backends."""
+
+    def submit(self, kind: str, payload: Dict[str, Any], principal: Principal) -> str:
+        raise NotImplementedError
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Renew the worker's claim on a running job; False once it has lost it."""
+        raise NotImplementedError
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]):
+        raise NotImplementedError
+
+    def fail(self, job_id: str, worker_id: str, error: str):
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def pending_count(self, principal_key: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def collect_charges(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """(principal key, kind, result) of jobs finished since the last call."""
+        raise NotImplementedError
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue stored in a SQLite file, safe to share between processes on one host.
+    Workers renew their claim with heartbeat(); a running job that has not had
+    one for `stale_after` seconds (e.g. its worker crashed) is handed out again,
+    and only the worker holding the claim can finish it.
+    """
+
+    def __init__(self, path: str, stale_after: float = 300, result_ttl: float = 3600):
+        self.path = path
+        self.stale_after = stale_after
+        self.result_ttl = result_ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            # Added after the first release; older job files get them here
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (
+                ("principal", "TEXT NOT NULL DEFAULT 'anonymous'"),
+                ("lane", "INTEGER NOT NULL DEFAULT 1"),
+                ("weight", "REAL NOT NULL DEFAULT 1.0"),
+                ("charged", "INTEGER NOT NULL DEFAULT 0"),
+            ):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_principal_status ON jobs (principal, status)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def submit(self, kind: str, payload: Dict[str, Any], principal: Principal) -> str:
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            """
+            INSERT INTO jobs (id, kind, status, payload, created_at, principal, lane, weight)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                job_id, kind, JobStatus.QUEUED, json.dumps(payload), time.time(),
+                principal.key, principal.lane, principal.weight,
+            ),
+        )
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the next queued (or stale running) job in fair order:
+        by lane (staff first), then the fewest jobs already running for the
+        job's principal relative to its weight, then the oldest.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                SELECT * FROM jobs AS job
+                WHERE status = ? OR (status = ? AND started_at < ?)
+                ORDER BY
+                    lane,
+                    (SELECT COUNT(*) FROM jobs AS other
+                     WHERE other.principal = job.principal AND other.status = ?) / weight,
+                    created_at
+                LIMIT 1
+                """,
+                (JobStatus.QUEUED, JobStatus.RUNNING, now - self.stale_after, JobStatus.RUNNING),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started_at = ? WHERE id = ?",
+                (JobStatus.RUNNING, worker_id, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        job = self._to_dict(row)
+        job["status"] = JobStatus.RUNNING
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        cursor = self._connect().execute(
+            "UPDATE jobs SET started_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time(), job_id, worker_id, JobStatus.RUNNING),
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]):
+        self._finish(job_id, worker_id, JobStatus.COMPLETED, result=json.dumps(result))
+
+    def fail(self, job_id: str, worker_id: str, error: str):
+        self._finish(job_id, worker_id, JobStatus.FAILED, error=error)
+
+    def _finish(
+        self, job_id: str, worker_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None
+    ):
+        now = time.time()
+        conn = self._connect()
+        # A worker whose claim went stale and was handed to another one must not
+        # overwrite (and charge again) the job's result
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (status, result, error, now, job_id, worker_id, JobStatus.RUNNING),
+        )
+        if now - self._last_purge > 60:
+            self._last_purge = now
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (*JobStatus.FINISHED, now - self.result_ttl),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def pending_count(self, principal_key: Optional[str] = None) -> int:
+        """Queued and running jobs, of one principal if `principal_key` is given."""
+        if principal_key is None:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (JobStatus.QUEUED, JobStatus.RUNNING)
+            ).fetchone()
+        else:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM jobs WHERE principal = ? AND status IN (?, ?)",
+                (principal_key, JobStatus.QUEUED, JobStatus.RUNNING),
+            ).fetchone()
+        return row[0]
+
+    def collect_charges(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """(principal key, kind, result) of jobs finished since the last call; failed jobs have no result."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, principal, kind, result FROM jobs WHERE status = ? AND charged = 0",
+                (JobStatus.COMPLETED,),
+            ).fetchall()
+            conn.execute("UPDATE jobs SET charged = 1 WHERE status IN (?, ?) AND charged = 0", JobStatus.FINISHED)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(row["principal"], row["kind"], json.loads(row["result"])) for row in rows if row["result"]]
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
@@ -1,64 +1,148 @@
-from typing import Optional
+"""
+Per-language sandbox settings.
+Loaded from languages.json (or CODE_EXECUTION_LANGUAGES_FILE); edits to the
+file are picked up within a few seconds without a restart.
+"""
+import logging
+import os
+import json
+import time
+import threading
+from typing import Dict, Optional
 
+logger = logging.getLogger(__name__)
 
-class LanguageConfig:    
+DEFAULT_LANGUAGES_FILE = os.path.join(os.path.dirname(__file__), "languages.json")
+
+# How often lookups check whether the file changed
+RELOAD_CHECK_INTERVAL = 2.0
+
+
+class LanguageConfig:
     def __init__(
         self,
         image: str,
         file_ext: str,
         run_cmd: str,
         compile_cmd: Optional[str] = None,
+        artifacts: Optional[str] = None,
         timeout: int = 10,
         memory: str = "256m",
         cpu_period: int = 100000,
         cpu_quota: int = 50000,
+        cache_results: bool = True,
+        backend: str = "docker",
+        sample_code: str = "",
+        repl_driver: Optional[str] = None,
+        repl_cmd: Optional[str] = None,
+        zygote_driver: Optional[str] = None,
+        zygote_cmd: Optional[str] = None,
     ):
         self.image = image
         self.file_ext = file_ext
         self.run_cmd = run_cmd
         self.compile_cmd = compile_cmd
+        self.artifacts = artifacts  # Shell glob of compiler output to cache
         self.timeout = timeout
         self.memory = memory
         self.cpu_period = cpu_period
         self.cpu_quota = cpu_quota
+        self.cache_results = cache_results  # Disable for languages whose programs are nondeterministic
+        self.backend = backend  # Sandbox backend: "docker", "local" or "fake"
+        self.sample_code = sample_code  # Small program used by benchmarks
+        self.repl_driver = repl_driver  # Driver script in utils/code_execution/repl/ for sessions
+        self.repl_cmd = repl_cmd  # Starts the driver; {driver} is its path, {max_output} the output cap
+        self.zygote_driver = zygote_driver  # Zygote in utils/code_execution/zygote/, used with CODE_EXECUTION_ZYGOTE
+        self.zygote_cmd = zygote_cmd  # Starts it; {driver} is its path, {timeout} and {memory} (bytes) the run limits
+
+
+def load_languages(path: str) -> Dict[str, LanguageConfig]:
+    """Parse a languages file ({"name": {LanguageConfig fields}}); raises ValueError if invalid."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Failed to read {path}: {e}")
+    if not isinstance(data, dict) or not data:
+        raise ValueError(f"{path} must map language names to their settings")
+
+    languages = {}
+    for name, fields in data.items():
+        try:
+            languages[name.lower()] = LanguageConfig(**fields)
+        except TypeError as e:
+            raise ValueError(f"Invalid settings for {name} in {path}: {e}")
+    return languages
+
 
+_lock = threading.Lock()
+_source = {"path": DEFAULT_LANGUAGES_FILE, "mtime": None, "checked": 0.0}
+LANGUAGES = {}
 
-LANGUAGES = {
-    "python": LanguageConfig(
-        image="python:3.12-alpine",
-        file_ext=".py",
-        run_cmd="python {file}",
-        compile_cmd=None,
-        timeout=10,
-        memory="256m",
-    ),
-    "javascript": LanguageConfig(
-        image="node:20-alpine",
-        file_ext=".js",
-        run_cmd="node {file}",
-        compile_cmd=None,
-        timeout=10,
-        memory="256m",
-    ),
-    "java": LanguageConfig(
-        image="openjdk:17-alpine",
-        file_ext=".java",
-        run_cmd="java Main",
-        compile_cmd="javac {file}",
-        timeout=15,
-        memory="512m",
-    ),
-}
+
+def use_languages_file(path: str):
+    """Load languages from `path` from now on; raises ValueError if it is invalid."""
+    load_languages(path)
+    with _lock:
+        _source["path"] = path
+        _source["mtime"] = None
+    reload_languages()
+
+
+def reload_languages() -> bool:
+    """
+    Reload the languages file if it changed since the last load. A broken
+    file is reported and the current settings are kept.
+    """
+    global LANGUAGES
+    with _lock:
+        path = _source["path"]
+        _source["checked"] = time.monotonic()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError as e:
+            if not LANGUAGES:
+                raise ValueError(f"Languages file not found: {e}")
+            logger.warning("Cannot read languages file, keeping current settings: %s", e)
+            return False
+        if mtime == _source["mtime"]:
+            return False
+        try:
+            languages = load_languages(path)
+        except ValueError as e:
+            if not LANGUAGES:
+                raise
+            logger.warning("%s; keeping current language settings", e)
+            _source["mtime"] = mtime  # Do not retry until the file changes again
+            return False
+        reloaded = bool(LANGUAGES)
+        # Replaced rather than mutated, so readers see either the old or the new set
+        LANGUAGES = languages
+        _source["mtime"] = mtime
+    if reloaded:
+        logger.info("Reloaded language settings from %s: %s", path, ", ".join(languages))
+    return True
+
+
+def _check_reload():
+    if time.monotonic() - _source["checked"] >= RELOAD_CHECK_INTERVAL:
+        reload_languages()
 
 
 def get_supported_languages():
+    _check_reload()
     return list(LANGUAGES.keys())
 
 
 def get_language_config(language: str) -> LanguageConfig:
-    if language not in LANGUAGES:
+    _check_reload()
+    languages = LANGUAGES
+    if language not in languages:
         raise ValueError(
             f"Unsupported language: {language}. "
-            f"Supported languages: {', '.join(get_supported_languages())}"
+            f"Supported languages: {', '.join(languages)}"
         )
-    return LANGUAGES[language]
\ No newline at end of file
+    return languages[language]
+
+
+reload_languages()
@@ -0,0 +1,160 @@
+"""
+Minimal Prometheus instrumentation for the code execution pipeline.
+Metrics live in this process and are rendered in the Prometheus text
+exposition format by the /metrics endpoint.
+"""
+import math
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+REGISTRY = []
+
+# Seconds; covers sub-millisecond tar builds up to full timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines += self._samples()
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(labels + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+EXECUTIONS = Counter(
+    "code_execution_executions_total", "Finished executions.", ["language", "cached"]
+)
+PHASE_SECONDS = Histogram(
+    "code_execution_phase_seconds", "Wall-clock time spent in each sandbox phase.", ["language", "phase"]
+)
+USER_CPU_SECONDS = Histogram(
+    "code_execution_user_cpu_seconds", "CPU time used by the user program itself.", ["language"]
+)
+OVERHEAD_SECONDS = Histogram(
+    "code_execution_overhead_seconds", "Time spent outside the user program (setup, upload, compile, release).",
+    ["language"],
+)
+IN_FLIGHT = Gauge("code_execution_in_flight", "Executions currently holding a sandbox slot.")
+QUEUE_DEPTH = Gauge("code_execution_queue_depth", "Executions waiting for a sandbox slot.")
+TIMEOUTS = Counter("code_execution_timeouts_total", "Programs killed for exceeding the time limit.", ["language"])
+OOM_KILLS = Counter("code_execution_oom_kills_total", "Programs killed for exceeding the memory limit.", ["language"])
+COMPILE_FAILURES = Counter(
+    "code_execution_compile_failures_total", "Submissions that failed to compile.", ["language"]
+)
+IMAGE_NOT_FOUND = Counter(
+    "code_execution_image_not_found_total", "Executions that failed because the image was missing.", ["language"]
+)
+ERRORS = Counter("code_execution_errors_total", "Executions that failed inside the pipeline.", ["language"])
+SESSIONS = Gauge("code_execution_sessions", "Open REPL sessions.")
+HOST_IN_FLIGHT = Gauge("code_execution_host_in_flight", "Executions running on each Docker host.", ["host"])
+HOST_HEALTHY = Gauge("code_execution_host_healthy", "Whether each Docker host is taking executions (1) or ejected (0).", ["host"])
+REAPED_CONTAINERS = Counter(
+    "code_execution_reaped_containers_total", "Leaked sandbox containers removed by the reaper.", ["reason"]
+)
+PEAK_MEMORY_BYTES = Histogram(
+    "code_execution_peak_memory_bytes", "Peak memory used by the user program.", ["language"],
+    buckets=tuple(2 ** power * 1024 * 1024 for power in range(11)),  # 1 MiB to 1 GiB
+)
+RESERVED_MEMORY = Gauge("code_execution_reserved_memory_bytes", "Memory reserved by admitted executions.")
+RESERVED_CPU = Gauge("code_execution_reserved_cpu_cores", "CPU reserved by admitted executions.")
@@ -0,0 +1,113 @@
+"""
+Multi-file projects.
+Validates user supplied file trees and streams them into sandboxes as a tar
+whose file contents are passed through by reference, so a large project is
+never assembled into a second in-memory archive.
+"""
+import time
+import base64
+import hashlib
+import tarfile
+import posixpath
+from typing import Dict, Iterator, List, Optional, Union
+
+FileContent = Union[str, bytes]
+
+MAX_FILES = 200
+
+
+def normalize_path(path: str) -> str:
+    """Return a clean workspace-relative path, rejecting anything that could escape it."""
+    if not path or "\0" in path or "\\" in path:
+        raise ValueError(f"Invalid file path: {path!r}")
+    normalized = posixpath.normpath(path)
+    if normalized.startswith("/") or normalized == "." or normalized.split("/")[0] == "..":
+        raise ValueError(f"File path must be relative to the project root: {path!r}")
+    return normalized
+
+
+def decode_files(files: Optional[List[dict]], max_bytes: int) -> Optional[Dict[str, bytes]]:
+    """
+    Turn request files ({"path", "content", "encoding": "utf-8" | "base64"})
+    into a path -> bytes mapping, enforcing the file count and total size.
+    """
+    if not files:
+        return None
+    if len(files) > MAX_FILES:
+        raise ValueError(f"Too many files (at most {MAX_FILES})")
+
+    decoded = {}
+    total = 0
+    for file in files:
+        path = normalize_path(file["path"])
+        if path in decoded:
+            raise ValueError(f"Duplicate file path: {path}")
+        if file.get("encoding") == "base64":
+            try:
+                content = base64.b64decode(file["content"], validate=True)
+            except ValueError:
+                raise ValueError(f"Invalid base64 content for {path}")
+        else:
+            content = file["content"].encode("utf-8")
+        total += len(content)
+        if total > max_bytes:
+            raise ValueError(f"Project is larger than {max_bytes} bytes")
+        decoded[path] = content
+    return decoded
+
+
+def check_reserved(files: Optional[Dict[str, FileContent]], reserved: List[str]):
+    """Raise ValueError if a project file would take, or sit under, one of the `reserved` paths."""
+    for name in reserved:
+        if name in (files or {}) or any(path.startswith(f"{name}/") for path in files or {}):
+            raise ValueError(f"'{name}' is reserved and cannot be used as a project file name")
+
+
+def files_digest(files: Optional[Dict[str, FileContent]]) -> str:
+    """Stable hash of a file tree, for cache keys."""
+    digest = hashlib.sha256()
+    for path in sorted(files or {}):
+        content = files[path]
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        digest.update(path.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+def iter_archive(files: Dict[str, FileContent], uid: int = 0, gid: int = 0) -> Iterator[bytes]:
+    """
+    Yield a tar archive of `files` chunk by chunk: a header per file followed
+    by the file's own bytes object (not a copy) and its block padding.
+    Entries, including the parent directories, are owned by `uid`:`gid`.
+    """
+    now = time.time()
+    directories = set()
+    for name, content in files.items():
+        parents = []
+        parent = posixpath.dirname(name)
+        while parent and parent not in directories:
+            directories.add(parent)
+            parents.append(parent)
+            parent = posixpath.dirname(parent)
+        for directory in reversed(parents):
+            info = tarfile.TarInfo(name=directory)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            info.mtime = now
+            info.uid, info.gid = uid, gid
+            yield info.tobuf(format=tarfile.PAX_FORMAT)
+
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        info = tarfile.TarInfo(name=name)
+        info.size = len(data)
+        info.mtime = now
+        info.uid, info.gid = uid, gid
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+        if data:
+            yield data
+        padding = -len(data) % tarfile.BLOCKSIZE
+        if padding:
+            yield tarfile.NUL * padding
+    # End-of-archive marker: two empty blocks
+    yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
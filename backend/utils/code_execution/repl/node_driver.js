@@ -0,0 +1,49 @@
+// REPL driver run inside a session sandbox (see utils/code_execution/sessions.py).
+// Reads JSON requests from the .repl/req FIFO, evaluates them in one
+// persistent vm context and writes a JSON reply to the .repl/resp FIFO.
+const fs = require("fs");
+const vm = require("vm");
+const util = require("util");
+
+const MAX_OUTPUT = parseInt(process.argv[2] || "65536", 10);
+let stdout = [];
+let stderr = [];
+
+const format = (args) => util.format(...args) + "\n";
+const sandboxConsole = {
+  log: (...args) => { stdout.push(format(args)); },
+  info: (...args) => { stdout.push(format(args)); },
+  debug: (...args) => { stdout.push(format(args)); },
+  error: (...args) => { stderr.push(format(args)); },
+  warn: (...args) => { stderr.push(format(args)); },
+};
+// Timers are left out: the driver blocks on the FIFO, so callbacks would never run
+const context = vm.createContext({ console: sandboxConsole, require });
+
+while (true) {
+  const request = JSON.parse(fs.readFileSync(".repl/req", "utf8"));
+  stdout = [];
+  stderr = [];
+  let error = null;
+
+  try {
+    const value = vm.runInContext(request.code, context, { filename: "<cell>" });
+    if (value !== undefined) {
+      stdout.push(util.inspect(value) + "\n");
+    }
+  } catch (e) {
+    error = e instanceof Error ? `${e.name}: ${e.message}` : String(e);
+    // Keep only the frames from the user's code, not the driver's
+    const stack = e && e.stack ? e.stack.split("\n").filter((line) => !line.trim().startsWith("at ") || line.includes("<cell>")) : [String(e)];
+    stderr.push(stack.join("\n") + "\n");
+  }
+
+  const reply = { stdout: stdout.join(""), stderr: stderr.join(""), error, truncated: false };
+  for (const name of ["stdout", "stderr"]) {
+    if (reply[name].length > MAX_OUTPUT) {
+      reply[name] = reply[name].slice(0, MAX_OUTPUT);
+      reply.truncated = true;
+    }
+  }
+  fs.writeFileSync(".repl/resp", JSON.stringify(reply));
+}
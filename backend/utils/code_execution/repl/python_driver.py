@@ -0,0 +1,57 @@
+"""
+REPL driver run inside a session sandbox (see utils/code_execution/sessions.py).
+Reads JSON requests from the .repl/req FIFO, executes them in one
+persistent namespace and writes a JSON reply to the .repl/resp FIFO.
+Standard library only: it runs with the sandbox image's interpreter.
+"""
+import io
+import ast
+import sys
+import json
+import traceback
+import contextlib
+
+MAX_OUTPUT = int(sys.argv[1]) if len(sys.argv) > 1 else 64 * 1024
+namespace = {"__name__": "__main__"}
+
+
+def run(code):
+    tree = ast.parse(code, "<cell>", "exec")
+    last = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        # Show the value of a trailing expression, like an interactive prompt
+        last = ast.Expression(tree.body.pop().value)
+    exec(compile(tree, "<cell>", "exec"), namespace)
+    if last is not None:
+        value = eval(compile(last, "<cell>", "eval"), namespace)
+        if value is not None:
+            print(repr(value))
+
+
+while True:
+    with open(".repl/req") as f:
+        request = json.loads(f.read())
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    error = None
+    sys.stdin = io.StringIO(request.get("stdin") or "")
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            run(request["code"])
+        except BaseException as e:
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            error = f"{type(e).__name__}: {e}"
+            # Hide the driver's own frames from the traceback
+            tb = e.__traceback__
+            while tb is not None and tb.tb_frame.f_code.co_filename != "<cell>":
+                tb = tb.tb_next
+            traceback.print_exception(type(e), e, tb)
+
+    reply = {"stdout": stdout.getvalue(), "stderr": stderr.getvalue(), "error": error, "truncated": False}
+    for name in ("stdout", "stderr"):
+        if len(reply[name]) > MAX_OUTPUT:
+            reply[name] = reply[name][:MAX_OUTPUT]
+            reply["truncated"] = True
+    with open(".repl/resp", "w") as f:
+        f.write(json.dumps(reply))
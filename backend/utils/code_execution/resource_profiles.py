@@ -0,0 +1,66 @@
+"""
+Rolling per-language resource usage.
+Records the peak memory and CPU rate of recent executions so admission
+control can reserve what programs actually use instead of the nominal
+limits in LanguageConfig (which stay in force as the hard sandbox limits).
+"""
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+from utils.numeric import parse_memory, quantile
+
+
+class ResourceProfiles:
+    """
+    Keeps the last `window` samples per language. Once a language has
+    `min_samples`, its estimate is the `quantile` of observed usage times
+    `headroom`, capped at the nominal limits; before that it is the nominal limits.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20, quantile: float = 0.95, headroom: float = 1.25):
+        self.window = window
+        self.min_samples = min_samples
+        self.quantile = quantile
+        self.headroom = headroom
+        self._lock = threading.Lock()
+        self._memory = {}  # language -> deque of peak bytes
+        self._cpu = {}  # language -> deque of cores used (CPU seconds / wall seconds)
+
+    def record(self, language: str, peak_memory: Optional[int], cpu_time: Optional[float], wall_time: float):
+        with self._lock:
+            if peak_memory is not None:
+                self._memory.setdefault(language, deque(maxlen=self.window)).append(peak_memory)
+            if cpu_time is not None and wall_time > 0:
+                self._cpu.setdefault(language, deque(maxlen=self.window)).append(cpu_time / wall_time)
+
+    def estimate(self, language: str, config) -> Tuple[int, float]:
+        """Memory (bytes) and CPU (cores) to reserve for one run of `language`."""
+        reserve_memory = parse_memory(config.memory)
+        reserve_cpu = config.cpu_quota / config.cpu_period
+        with self._lock:
+            memory = list(self._memory.get(language, ()))
+            cpu = list(self._cpu.get(language, ()))
+
+        if len(memory) >= self.min_samples:
+            reserve_memory = min(reserve_memory, int(quantile(memory, self.quantile) * self.headroom))
+        if len(cpu) >= self.min_samples:
+            reserve_cpu = min(reserve_cpu, quantile(cpu, self.quantile) * self.headroom)
+        return reserve_memory, reserve_cpu
+
+    def profile(self, language: str, config) -> Dict[str, Any]:
+        """Observed usage of `language` and what a run of it currently reserves."""
+        with self._lock:
+            memory = list(self._memory.get(language, ()))
+            cpu = list(self._cpu.get(language, ()))
+        reserve_memory, reserve_cpu = self.estimate(language, config)
+        return {
+            "memory_samples": len(memory),
+            "memory_p50": quantile(memory, 0.5) if memory else None,
+            "memory_p95": quantile(memory, 0.95) if memory else None,
+            "memory_max": max(memory) if memory else None,
+            "cpu_samples": len(cpu),
+            "cpu_p50": round(quantile(cpu, 0.5), 3) if cpu else None,
+            "cpu_p95": round(quantile(cpu, 0.95), 3) if cpu else None,
+            "reserve_memory": reserve_memory,
+            "reserve_cpu": round(reserve_cpu, 3),
+        }
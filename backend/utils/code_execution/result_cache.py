@@ -0,0 +1,100 @@
+"""
+Content-addressed cache of execution results.
+Keys are derived from the language, the image digest and hashes of the code
+and stdin, so identical submissions are answered without touching a sandbox.
+"""
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from utils.code_execution.project import files_digest
+
+
+class ResultCacheBackend:
+    """Storage interface; implement this to share the cache across workers."""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryResultCacheBackend(ResultCacheBackend):
+    """Per-process LRU with a per-entry expiry time."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class ResultCache:
+    def __init__(self, backend: ResultCacheBackend, ttl: float = 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key(
+        language: str, image_digest: str, code: str, stdin: Optional[str], files: Optional[Dict[str, bytes]] = None
+    ) -> str:
+        code_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        stdin_hash = hashlib.sha256((stdin or "").encode("utf-8")).hexdigest()
+        key = f"{language}:{image_digest}:{code_hash}:{stdin_hash}"
+        if files:
+            key = f"{key}:{files_digest(files)}"
+        return key
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Like get(), but a miss is not counted (the caller will get() again)."""
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self._hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        self.backend.set(key, value, self.ttl)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": self.backend.size(), "hits": self._hits, "misses": self._misses}
@@ -0,0 +1,11 @@
+from utils.code_execution.sandbox.base import (
+    Sandbox,
+    SandboxBackend,
+    SandboxError,
+    SandboxImageNotFound,
+    SandboxProcess,
+)
+from utils.code_execution.sandbox.fake_backend import FakeBackend
+from utils.code_execution.sandbox.local_backend import LocalBackend
+from utils.code_execution.sandbox.docker_backend import DockerBackend
+from utils.code_execution.sandbox.multi_host_backend import MultiHostDockerBackend
@@ -0,0 +1,97 @@
+"""
+Interface between CodeExecutor and the thing that actually runs user code.
+A backend hands out sandboxes (one per execution); a sandbox holds a
+workspace directory and starts processes inside it.
+"""
+from typing import Dict, Any, Iterator, Optional, Tuple
+from utils.code_execution.timing import PhaseTimings
+from utils.code_execution.project import FileContent, iter_archive
+
+
+class SandboxError(Exception):
+    pass
+
+
+class SandboxImageNotFound(SandboxError):
+    def __init__(self, image: str):
+        super().__init__(f"Docker image '{image}' not found")
+        self.image = image
+
+
+class SandboxProcess:
+    """A command running inside a sandbox."""
+
+    def output(self) -> Iterator[Tuple[str, bytes]]:
+        """Yield ("stdout" | "stderr", chunk) until the process closes its output."""
+        raise NotImplementedError
+
+    def kill(self):
+        """Kill the process (and anything it spawned). Safe to call from another thread."""
+        raise NotImplementedError
+
+    def wait(self) -> int:
+        """Return the exit code, waiting briefly if the process is still exiting."""
+        raise NotImplementedError
+
+    def cpu_time(self) -> Optional[float]:
+        """CPU seconds used by the finished process, if the backend can tell."""
+        return None
+
+    def peak_memory(self) -> Optional[int]:
+        """Peak memory (bytes) used by the finished process, if the backend can tell."""
+        return None
+
+
+class Sandbox:
+    """An isolated workspace acquired for a single execution."""
+
+    def __init__(self, language: str, config):
+        self.language = language
+        self.config = config
+        # Command template for running the program; {file} is the source file
+        self.run_cmd = config.run_cmd
+
+    def put_archive(self, archive: bytes):
+        """Extract a tar archive into the workspace."""
+        raise NotImplementedError
+
+    def put_files(self, files: Dict[str, FileContent]):
+        """Write `files` (workspace-relative path -> text or bytes) into the workspace."""
+        self.put_archive(b"".join(iter_archive(files)))
+
+    def start(self, cmd: str) -> SandboxProcess:
+        """Start `sh -c cmd` in the workspace."""
+        raise NotImplementedError
+
+    def run(self, cmd: str) -> Tuple[int, bytes]:
+        """Run a short helper command to completion, returning (exit code, stdout)."""
+        raise NotImplementedError
+
+
+class SandboxBackend:
+    name = None
+
+    def acquire(self, language: str, config, timings: Optional[PhaseTimings] = None) -> Sandbox:
+        """Hand out a ready sandbox; slow set-up steps are recorded in `timings`."""
+        raise NotImplementedError
+
+    def prepare(self, language: str, config):
+        """Fetch whatever `language` needs (e.g. its image) ahead of the first run."""
+
+    def release(self, sandbox: Sandbox):
+        """Return a sandbox once the execution is done with it."""
+        raise NotImplementedError
+
+    def image_digest(self, config, resolve: bool = True) -> Optional[str]:
+        """
+        Identifier of the runtime the code will run on, used in cache keys.
+        With resolve=False only already-known digests are returned (no I/O).
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-language pool statistics, if the backend pools sandboxes."""
+        return {}
+
+    def shutdown(self):
+        pass
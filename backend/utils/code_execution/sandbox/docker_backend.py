@@ -0,0 +1,217 @@
+"""
+Sandbox backend running code in Docker containers from a warm ContainerPool.
+"""
+import logging
+import time
+import docker
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from utils.code_execution.container_pool import (
+    SANDBOX_UID,
+    USAGE_CMD,
+    ZYGOTE_RUN_CMD,
+    ContainerPool,
+    parse_usage,
+)
+from utils.code_execution.container_reaper import ContainerReaper
+from utils.code_execution.timing import PhaseTimings
+from utils.code_execution.project import FileContent, iter_archive
+from utils.code_execution.sandbox.base import (
+    Sandbox,
+    SandboxBackend,
+    SandboxError,
+    SandboxImageNotFound,
+    SandboxProcess,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DockerProcess(SandboxProcess):
+    def __init__(self, sandbox: "DockerSandbox", cmd: str):
+        self.sandbox = sandbox
+        self.api = sandbox.client.api
+        # One process runs in the container at a time, so the change in its
+        # CPU counter from here to the end of the run is the program's
+        self._cpu_start = sandbox.last_usage[0]
+        self._cpu_time = None
+        self._peak_memory = None
+        self.exec_id = self.api.exec_create(
+            sandbox.container.id, cmd=["sh", "-c", cmd], workdir="/workspace"
+        )["Id"]
+        self._stream = self.api.exec_start(self.exec_id, stream=True, demux=True)
+
+    def output(self) -> Iterator[Tuple[str, bytes]]:
+        for stdout_chunk, stderr_chunk in self._stream:
+            if stdout_chunk:
+                yield "stdout", stdout_chunk
+            if stderr_chunk:
+                yield "stderr", stderr_chunk
+
+    def kill(self):
+        self.sandbox.kill_processes()
+
+    def wait(self, timeout: float = 2.0) -> int:
+        deadline = time.time() + timeout
+        while True:
+            info = self.api.exec_inspect(self.exec_id)
+            if not info.get("Running") and info.get("ExitCode") is not None:
+                self._measure()
+                return info["ExitCode"]
+            if time.time() >= deadline:
+                return 137
+            time.sleep(0.05)
+
+    def cpu_time(self) -> Optional[float]:
+        return self._cpu_time
+
+    def peak_memory(self) -> Optional[int]:
+        return self._peak_memory
+
+    def _measure(self):
+        cpu, peak = self.sandbox.read_usage()
+        if cpu is not None and self._cpu_start is not None:
+            self._cpu_time = max(0.0, cpu - self._cpu_start)
+        # memory.peak covers the container's whole life and cannot be reset from
+        # inside it, so after earlier runs this run's peak is unknown; a sample
+        # only from runs that raised it would overstate the typical peak
+        if peak is not None and self.sandbox.fresh:
+            self._peak_memory = peak
+
+
+class DockerSandbox(Sandbox):
+    def __init__(
+        self, language: str, config, client, container, zygote: bool = False,
+        usage: Tuple[Optional[float], Optional[int]] = (None, None), fresh: bool = False,
+    ):
+        """
+        `usage` is the container's cgroup usage as of its last wipe (see ContainerPool.usage).
+        `fresh` containers have not run anything before, so their memory.peak is this
+        execution's peak memory (compile included); only their processes report one.
+        """
+        super().__init__(language, config)
+        self.client = client
+        self.container = container
+        self.last_usage = usage
+        self.fresh = fresh
+        if zygote:
+            self.run_cmd = ZYGOTE_RUN_CMD
+
+    def put_archive(self, archive: bytes):
+        self.container.put_archive('/workspace', archive)
+
+    def put_files(self, files: Dict[str, FileContent]):
+        # Stream the tar to the Docker API (chunked) instead of building it in memory;
+        # owned by the sandbox user, so programs can write next to their files
+        self.container.put_archive('/workspace', iter_archive(files, uid=SANDBOX_UID, gid=SANDBOX_UID))
+
+    def start(self, cmd: str) -> DockerProcess:
+        return DockerProcess(self, cmd)
+
+    def run(self, cmd: str) -> Tuple[int, bytes]:
+        exec_result = self.container.exec_run(["sh", "-c", cmd], workdir="/workspace", demux=True)
+        stdout, _ = exec_result.output
+        return exec_result.exit_code, stdout or b""
+
+    def read_usage(self) -> Tuple[Optional[float], Optional[int]]:
+        """Read the container's CPU seconds and peak memory so far, and remember them as `last_usage`."""
+        try:
+            exec_result = self.container.exec_run(USAGE_CMD, user="root", workdir="/")
+        except Exception:
+            return None, None
+        self.last_usage = parse_usage(exec_result.output)
+        return self.last_usage
+
+    def kill_processes(self):
+        """Kill every process in the container except its keepalive (PID 1)."""
+        try:
+            self.container.exec_run("kill -9 -1", workdir="/")
+        except Exception as e:
+            logger.warning("Failed to kill processes in container %s: %s", self.container.id, e)
+
+
+class DockerBackend(SandboxBackend):
+    name = "docker"
+
+    def __init__(
+        self,
+        pool_min_size: int = 1,
+        pool_max_size: int = 4,
+        pool_max_uses: int = 50,
+        languages: Optional[List[str]] = None,
+        client=None,
+        container_max_age: float = 3600,
+        reaper_interval: float = 60,
+        zygote: bool = False,
+    ):
+        """With `zygote`, languages that have one run programs through a resident zygote (see ContainerPool)."""
+        try:
+            self.client = client or docker.from_env()
+            self.client.ping()  # Test Docker connection
+        except Exception as e:
+            raise SandboxError(
+                f"Failed to connect to Docker. Make sure Docker is running. Error: {str(e)}"
+            )
+
+        self._image_digests = {}
+        self.pool = ContainerPool(
+            self.client,
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            max_uses=pool_max_uses,
+            max_age=container_max_age,
+            languages=languages,
+            zygote=zygote,
+        )
+        self.pool.start()
+        # Twice the pool's own limit, so it never reaps a live process's containers
+        self.reaper = ContainerReaper(
+            self.client, self.pool.owns, max_age=2 * container_max_age, interval=reaper_interval
+        )
+        self.reaper.start()
+
+    def acquire(self, language: str, config, timings: Optional[PhaseTimings] = None) -> DockerSandbox:
+        try:
+            container = self.pool.acquire(language, timings)
+        except docker.errors.ImageNotFound:
+            raise SandboxImageNotFound(config.image)
+        return DockerSandbox(
+            language, config, self.client, container,
+            zygote=self.pool.has_zygote(container), usage=self.pool.usage(container),
+            fresh=self.pool.unused(container),
+        )
+
+    def prepare(self, language: str, config):
+        """Pull the language's image unless it is already present."""
+        try:
+            self.client.images.get(config.image)
+        except docker.errors.ImageNotFound:
+            logger.info("Pulling image %s", config.image)
+            self.client.images.pull(config.image)
+        # The pool may have failed to create containers while the image was missing
+        self.pool.wake()
+
+    def release(self, sandbox: DockerSandbox):
+        # Hand the container back to be wiped and reused
+        self.pool.release(sandbox.language, sandbox.container)
+
+    def image_digest(self, config, resolve: bool = True) -> Optional[str]:
+        digest = self._image_digests.get(config.image)
+        if digest is None and resolve:
+            try:
+                digest = self.client.images.get(config.image).id
+            except Exception:
+                return None
+            self._image_digests[config.image] = digest
+        return digest
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return self.pool.stats()
+
+    def shutdown(self):
+        """Remove all pooled containers."""
+        self.reaper.shutdown()
+        self.pool.shutdown()
+
+    def reap(self) -> Dict[str, Any]:
+        """Kill and remove leaked sandbox containers now; see ContainerReaper."""
+        return self.reaper.reap()
@@ -0,0 +1,91 @@
+"""
+Deterministic in-memory sandbox backend for load tests and benchmarks.
+Nothing is executed: each command echoes its redirected stdin file (or the
+command itself) after a fixed delay, so the API can be exercised without Docker.
+"""
+import io
+import json
+import tarfile
+import threading
+from typing import Dict, Any, Iterator, Optional, Tuple
+from utils.code_execution.timing import PhaseTimings
+from utils.code_execution.project import FileContent
+from utils.code_execution.sandbox.base import Sandbox, SandboxBackend, SandboxProcess
+
+
+class FakeProcess(SandboxProcess):
+    def __init__(self, sandbox: "FakeSandbox", cmd: str, latency: float):
+        self.cmd = cmd
+        self.latency = latency
+        self._killed = threading.Event()
+
+        # "... < input.txt" echoes the input file, a REPL session request echoes
+        # its snippet, anything else echoes the command
+        self.stdout = f"{cmd}\n".encode("utf-8")
+        if " < " in cmd:
+            self.stdout = sandbox.files.get(cmd.rsplit(" < ", 1)[1].strip(), b"")
+        elif cmd.endswith("cat .repl/resp"):
+            request = json.loads(sandbox.files.get(".repl/in", b"{}"))
+            self.stdout = json.dumps({
+                "stdout": f"{request.get('code', '')}\n", "stderr": "", "error": None, "truncated": False,
+            }).encode("utf-8")
+
+    def output(self) -> Iterator[Tuple[str, bytes]]:
+        if self._killed.wait(self.latency):
+            return
+        if self.stdout:
+            yield "stdout", self.stdout
+
+    def kill(self):
+        self._killed.set()
+
+    def wait(self) -> int:
+        return 137 if self._killed.is_set() else 0
+
+
+class FakeSandbox(Sandbox):
+    def __init__(self, language: str, config, latency: float):
+        super().__init__(language, config)
+        self.latency = latency
+        self.files = {}
+
+    def put_archive(self, archive: bytes):
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            for member in tar.getmembers():
+                if member.isfile():
+                    self.files[member.name] = tar.extractfile(member).read()
+
+    def put_files(self, files: Dict[str, FileContent]):
+        for name, content in files.items():
+            self.files[name] = content.encode("utf-8") if isinstance(content, str) else content
+
+    def start(self, cmd: str) -> FakeProcess:
+        return FakeProcess(self, cmd, self.latency)
+
+    def run(self, cmd: str) -> Tuple[int, bytes]:
+        return 0, b""
+
+
+class FakeBackend(SandboxBackend):
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def acquire(self, language: str, config, timings: Optional[PhaseTimings] = None) -> FakeSandbox:
+        with self._lock:
+            stats = self._stats.setdefault(language, {"hits": 0, "misses": 0, "created": 0, "recycled": 0, "idle": 0})
+            stats["hits"] += 1
+        return FakeSandbox(language, config, self.latency)
+
+    def release(self, sandbox: FakeSandbox):
+        pass
+
+    def image_digest(self, config, resolve: bool = True) -> Optional[str]:
+        return f"fake:{config.image}"
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {language: dict(stats) for language, stats in self._stats.items()}
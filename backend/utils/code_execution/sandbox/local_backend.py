@@ -0,0 +1,184 @@
+"""
+Sandbox backend running code as a local subprocess.
+Meant for trusted or internal deployments where container start-up cost is
+unacceptable: each run gets a private temp directory, rlimits (CPU, memory,
+file size, process count) and an empty network namespace.
+"""
+import io
+import os
+import shutil
+import signal
+import tarfile
+import tempfile
+import resource
+import selectors
+import subprocess
+import time
+from typing import Dict, Iterator, Optional, Tuple
+from utils.numeric import parse_memory
+from utils.code_execution.timing import PhaseTimings
+from utils.code_execution.project import FileContent
+from utils.code_execution.sandbox.base import Sandbox, SandboxBackend, SandboxError, SandboxProcess
+
+
+class LocalProcess(SandboxProcess):
+    def __init__(self, sandbox: "LocalSandbox", cmd: str):
+        self._rusage = None
+        self.process = subprocess.Popen(
+            ["sh", "-c", cmd],
+            cwd=sandbox.workdir,
+            env=sandbox.backend.environment(sandbox.workdir),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            preexec_fn=sandbox.apply_limits,
+            start_new_session=True,  # Own process group, so kill() reaches children
+        )
+
+    def output(self) -> Iterator[Tuple[str, bytes]]:
+        selector = selectors.DefaultSelector()
+        selector.register(self.process.stdout, selectors.EVENT_READ, "stdout")
+        selector.register(self.process.stderr, selectors.EVENT_READ, "stderr")
+        try:
+            while selector.get_map():
+                for key, _ in selector.select():
+                    chunk = os.read(key.fileobj.fileno(), 65536)
+                    if not chunk:
+                        selector.unregister(key.fileobj)
+                        continue
+                    yield key.data, chunk
+        finally:
+            selector.close()
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def wait(self, timeout: float = 2.0) -> int:
+        try:
+            exit_code = self._reap(timeout)
+            if exit_code is None:
+                self.kill()
+                exit_code = self._reap(None)
+        finally:
+            self.process.stdout.close()
+            self.process.stderr.close()
+        # Report signals the way a shell would (SIGKILL -> 137)
+        return 128 - exit_code if exit_code < 0 else exit_code
+
+    def _reap(self, timeout: Optional[float]) -> Optional[int]:
+        """waitpid() via wait4() so the child's resource usage is kept."""
+        if self.process.returncode is not None:
+            return self.process.returncode
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pid, status, rusage = os.wait4(self.process.pid, 0 if deadline is None else os.WNOHANG)
+            if pid:
+                self._rusage = rusage
+                self.process.returncode = os.waitstatus_to_exitcode(status)
+                return self.process.returncode
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.01)
+
+    def cpu_time(self) -> Optional[float]:
+        if self._rusage is None:
+            return None
+        return self._rusage.ru_utime + self._rusage.ru_stime
+
+    def peak_memory(self) -> Optional[int]:
+        if self._rusage is None:
+            return None
+        return self._rusage.ru_maxrss * 1024  # Kilobytes on Linux
+
+
+class LocalSandbox(Sandbox):
+    def __init__(self, language: str, config, backend: "LocalBackend", workdir: str):
+        super().__init__(language, config)
+        self.backend = backend
+        self.workdir = workdir
+        self.processes = []
+
+    def put_archive(self, archive: bytes):
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            tar.extractall(self.workdir, filter="data")
+
+    def put_files(self, files: Dict[str, FileContent]):
+        # No archive needed: write straight into the workspace directory
+        root = os.path.realpath(self.workdir)
+        for name, content in files.items():
+            path = os.path.realpath(os.path.join(root, name))
+            if not path.startswith(root + os.sep):
+                raise SandboxError(f"File path escapes the workspace: {name}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(content.encode("utf-8") if isinstance(content, str) else content)
+
+    def start(self, cmd: str) -> LocalProcess:
+        process = LocalProcess(self, cmd)
+        self.processes.append(process)
+        return process
+
+    def run(self, cmd: str) -> Tuple[int, bytes]:
+        result = subprocess.run(
+            ["sh", "-c", cmd], cwd=self.workdir, capture_output=True, timeout=30,
+            env=self.backend.environment(self.workdir),
+        )
+        return result.returncode, result.stdout
+
+    def apply_limits(self):
+        """Runs in the child between fork and exec."""
+        if self.backend.isolate_network:
+            # A fresh user namespace lets an unprivileged process own a new,
+            # empty network namespace (loopback only, and down)
+            os.unshare(os.CLONE_NEWUSER | os.CLONE_NEWNET)
+        cpu_seconds = max(1, int(self.config.timeout))
+        memory = parse_memory(self.config.memory)
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        # RLIMIT_DATA rather than RLIMIT_AS: V8 and the JVM reserve large
+        # PROT_NONE address ranges up front and refuse to start under RLIMIT_AS
+        resource.setrlimit(resource.RLIMIT_DATA, (memory, memory))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (self.backend.max_file_size, self.backend.max_file_size))
+        resource.setrlimit(resource.RLIMIT_NPROC, (self.backend.max_processes, self.backend.max_processes))
+
+
+class LocalBackend(SandboxBackend):
+    name = "local"
+
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        isolate_network: bool = True,
+        max_file_size: int = 16 * 1024 * 1024,
+        max_processes: int = 128,
+    ):
+        if isolate_network and not hasattr(os, "unshare"):
+            raise SandboxError("Network isolation for the local sandbox needs Python 3.12+ (os.unshare)")
+        self.base_dir = base_dir
+        self.isolate_network = isolate_network
+        self.max_file_size = max_file_size
+        self.max_processes = max_processes
+
+    def environment(self, workdir: str) -> dict:
+        return {
+            "PATH": os.environ.get("PATH", "/usr/local/bin:/usr/bin:/bin"),
+            "HOME": workdir,
+            "TMPDIR": workdir,
+            "LANG": "C.UTF-8",
+        }
+
+    def acquire(self, language: str, config, timings: Optional[PhaseTimings] = None) -> LocalSandbox:
+        workdir = tempfile.mkdtemp(prefix=f"sandbox-{language}-", dir=self.base_dir)
+        return LocalSandbox(language, config, self, workdir)
+
+    def release(self, sandbox: LocalSandbox):
+        for process in sandbox.processes:
+            process.kill()
+            process.wait()
+        shutil.rmtree(sandbox.workdir, ignore_errors=True)
+
+    def image_digest(self, config, resolve: bool = True) -> Optional[str]:
+        interpreter = shutil.which(config.run_cmd.split()[0]) or config.run_cmd.split()[0]
+        return f"local:{interpreter}"
@@ -0,0 +1,239 @@
+"""
+Sandbox backend spreading executions over several Docker daemons.
+Each host gets its own DockerBackend (client and warm container pool); runs
+go to the least-loaded healthy host below its concurrency limit, and hosts
+that fail are ejected until a background health check readmits them.
+"""
+import logging
+import time
+import threading
+import docker
+from typing import Callable, Dict, Any, List, Optional
+from utils.code_execution import metrics
+from utils.code_execution.timing import PhaseTimings
+from utils.code_execution.sandbox.base import SandboxBackend, SandboxError, SandboxImageNotFound
+from utils.code_execution.sandbox.docker_backend import DockerBackend, DockerSandbox
+
+logger = logging.getLogger(__name__)
+
+
+class DockerHost:
+    def __init__(self, url: str, max_concurrency: int):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.backend = None  # DockerBackend once connected
+        self.healthy = False
+        self.active = 0
+        self.failures = 0
+
+    @property
+    def load(self) -> float:
+        return self.active / self.max_concurrency
+
+
+class MultiHostDockerBackend(SandboxBackend):
+    name = "docker"
+
+    def __init__(
+        self,
+        urls: List[str],
+        max_concurrency_per_host: int = 8,
+        health_interval: float = 10.0,
+        failure_threshold: int = 2,
+        acquire_timeout: float = 30.0,
+        pool_min_size: int = 1,
+        pool_max_size: int = 4,
+        pool_max_uses: int = 50,
+        languages: Optional[List[str]] = None,
+        client_factory: Optional[Callable[[str], Any]] = None,
+        container_max_age: float = 3600,
+        reaper_interval: float = 60,
+        zygote: bool = False,
+    ):
+        """`client_factory(url)` builds a docker client; override it to plug in fake endpoints."""
+        if not urls:
+            raise SandboxError("No Docker hosts configured")
+        self.hosts = [DockerHost(url, max_concurrency_per_host) for url in urls]
+        self.health_interval = health_interval
+        self.failure_threshold = failure_threshold
+        self.acquire_timeout = acquire_timeout
+        self.pool_options = {
+            "pool_min_size": pool_min_size,
+            "pool_max_size": pool_max_size,
+            "pool_max_uses": pool_max_uses,
+            "languages": languages,
+            "container_max_age": container_max_age,
+            "reaper_interval": reaper_interval,
+            "zygote": zygote,
+        }
+        self.client_factory = client_factory or (lambda url: docker.DockerClient(base_url=url))
+
+        self._lock = threading.Condition()
+        self._owners = {}  # container id -> host
+        self._prepared = {}  # language -> config, re-applied to readmitted hosts
+        self._stopped = threading.Event()
+
+        for host in self.hosts:
+            self._connect(host)
+        if not any(host.healthy for host in self.hosts):
+            raise SandboxError(f"Failed to connect to any Docker host ({', '.join(urls)})")
+
+        self._thread = threading.Thread(target=self._health_loop, name="docker-hosts", daemon=True)
+        self._thread.start()
+
+    def acquire(self, language: str, config, timings: Optional[PhaseTimings] = None) -> DockerSandbox:
+        tried = set()
+        while True:
+            host = self._reserve(tried)
+            try:
+                sandbox = host.backend.acquire(language, config, timings)
+            except SandboxImageNotFound:
+                self._unreserve(host)
+                raise
+            except Exception as e:
+                # Treat any other failure as the host's fault and try the next one
+                logger.warning("Docker host %s failed, ejecting it: %s", host.url, e)
+                self._unreserve(host)
+                self._eject(host)
+                tried.add(host.url)
+                continue
+
+            with self._lock:
+                self._owners[sandbox.container.id] = host
+            return sandbox
+
+    def release(self, sandbox: DockerSandbox):
+        with self._lock:
+            host = self._owners.pop(sandbox.container.id, None)
+        if host is None:
+            return
+        try:
+            host.backend.release(sandbox)
+        finally:
+            self._unreserve(host)
+
+    def prepare(self, language: str, config):
+        """Pull the image on every healthy host, and on hosts as they are readmitted."""
+        self._prepared[language] = config
+        errors = []
+        for host in self._healthy_hosts():
+            try:
+                host.backend.prepare(language, config)
+            except Exception as e:
+                errors.append(f"{host.url}: {e}")
+        if errors:
+            raise SandboxError(f"Failed to prepare {language} on {'; '.join(errors)}")
+
+    def image_digest(self, config, resolve: bool = True) -> Optional[str]:
+        for host in self._healthy_hosts():
+            digest = host.backend.image_digest(config, resolve)
+            if digest is not None:
+                return digest
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Pool counters summed over all connected hosts."""
+        totals = {}
+        for host in self.hosts:
+            if host.backend is None:
+                continue
+            for language, counters in host.backend.stats().items():
+                merged = totals.setdefault(language, {})
+                for name, value in counters.items():
+                    merged[name] = merged.get(name, 0) + value
+        return totals
+
+    def host_stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "url": host.url,
+                    "healthy": host.healthy,
+                    "active": host.active,
+                    "max_concurrency": host.max_concurrency,
+                }
+                for host in self.hosts
+            ]
+
+    def shutdown(self):
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        for host in self.hosts:
+            if host.backend is not None:
+                host.backend.shutdown()
+
+    def _healthy_hosts(self) -> List[DockerHost]:
+        with self._lock:
+            return [host for host in self.hosts if host.healthy]
+
+    def _reserve(self, tried: set) -> DockerHost:
+        """Take a slot on the least-loaded healthy host, waiting while all of them are full."""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._lock:
+            while True:
+                candidates = [
+                    host for host in self.hosts
+                    if host.healthy and host.url not in tried and host.active < host.max_concurrency
+                ]
+                if candidates:
+                    host = min(candidates, key=lambda host: host.load)
+                    host.active += 1
+                    self._update_gauges(host)
+                    return host
+                if not any(host.healthy and host.url not in tried for host in self.hosts):
+                    raise SandboxError("No healthy Docker host is available")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SandboxError("All Docker hosts are at their concurrency limit")
+                self._lock.wait(remaining)
+
+    def _unreserve(self, host: DockerHost):
+        with self._lock:
+            host.active -= 1
+            self._update_gauges(host)
+            self._lock.notify()
+
+    def _eject(self, host: DockerHost):
+        with self._lock:
+            host.healthy = False
+            host.failures = self.failure_threshold
+            self._update_gauges(host)
+            self._lock.notify_all()  # Waiters may need to give up
+
+    def _connect(self, host: DockerHost):
+        """(Re)connect to a host and warm its images before it takes traffic."""
+        try:
+            if host.backend is None:
+                host.backend = DockerBackend(client=self.client_factory(host.url), **self.pool_options)
+            else:
+                host.backend.client.ping()
+            for language, config in list(self._prepared.items()):
+                host.backend.prepare(language, config)
+        except Exception as e:
+            logger.warning("Docker host %s is unavailable: %s", host.url, e)
+            self._update_gauges(host)
+            return
+        with self._lock:
+            host.healthy = True
+            host.failures = 0
+            self._update_gauges(host)
+            self._lock.notify_all()
+
+    def _health_loop(self):
+        while not self._stopped.wait(self.health_interval):
+            for host in self.hosts:
+                if not host.healthy:
+                    self._connect(host)
+                    continue
+                try:
+                    host.backend.client.ping()
+                    host.failures = 0
+                except Exception as e:
+                    host.failures += 1
+                    if host.failures >= self.failure_threshold:
+                        logger.warning("Docker host %s failed %d health checks, ejecting it: %s", host.url, host.failures, e)
+                        self._eject(host)
+
+    def _update_gauges(self, host: DockerHost):
+        metrics.HOST_IN_FLIGHT.set(host.active, host=host.url)
+        metrics.HOST_HEALTHY.set(1 if host.healthy else 0, host=host.url)
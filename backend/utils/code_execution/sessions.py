@@ -0,0 +1,281 @@
+"""
+Persistent REPL sessions.
+Each session holds one sandbox with an interpreter kept running by a small
+driver script (utils/code_execution/repl/), so a snippet only pays for a
+single command round trip instead of container and interpreter start-up.
+"""
+import logging
+import os
+import json
+import time
+import uuid
+import threading
+from typing import Dict, Any, List, Optional
+from utils.code_execution import metrics
+from utils.code_execution.code_executer import CodeExecutor, CodeExecutionError
+from utils.code_execution.language_config import get_language_config, get_supported_languages
+from utils.numeric import parse_memory
+
+logger = logging.getLogger(__name__)
+
+DRIVER_DIR = os.path.join(os.path.dirname(__file__), "repl")
+
+# Hands the uploaded request to the driver, then waits for its reply
+REQUEST_CMD = "cat .repl/in > .repl/req && cat .repl/resp"
+
+# The driver caps stdout and stderr at max_output_bytes characters each; once
+# JSON-encoded a character takes at most 6 bytes ("\uXXXX")
+REPLY_EXPANSION = 12
+
+
+class SessionError(CodeExecutionError):
+    pass
+
+
+class SessionNotFoundError(SessionError):
+    def __init__(self, session_id: str):
+        super().__init__(f"Session {session_id} not found")
+
+
+class SessionLimitError(SessionError):
+    pass
+
+
+class Session:
+    def __init__(self, session_id: str, user_id: str, language: str, config, sandbox, driver, memory: int):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.language = language
+        self.config = config
+        self.sandbox = sandbox
+        self.driver = driver  # The interpreter's SandboxProcess
+        self.memory = memory
+
+        self.lock = threading.Lock()  # One snippet at a time
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.busy = False
+        self.closed = False
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "language": self.language,
+            "created_at": self.created_at,
+            "idle_seconds": round(time.monotonic() - self.last_used, 3),
+        }
+
+
+class SessionManager:
+    """
+    Owns every open session. Sessions are closed after `idle_timeout` seconds
+    without use; a user may hold at most `max_per_user` of them; and the memory
+    limits of all sessions together stay under `max_memory` bytes, evicting the
+    least recently used idle sessions to make room.
+    """
+
+    def __init__(
+        self,
+        executor: CodeExecutor,
+        idle_timeout: float = 600,
+        max_per_user: int = 2,
+        max_memory: int = 2 * 1024 ** 3,
+        reap_interval: float = 15,
+    ):
+        self.executor = executor
+        self.idle_timeout = idle_timeout
+        self.max_per_user = max_per_user
+        self.max_memory = max_memory
+        self.reap_interval = reap_interval
+
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._reserved = 0  # Memory of sessions still being created
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._reap_loop, name="session-reaper", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            self._close(session)
+
+    def create(self, user_id: str, language: str) -> Session:
+        if language not in get_supported_languages():
+            raise SessionError(f"Unsupported language: {language}")
+        config = get_language_config(language)
+        if not config.repl_cmd:
+            raise SessionError(f"Sessions are not supported for {language}")
+        memory = parse_memory(config.memory)
+
+        evicted = []
+        with self._lock:
+            owned = sum(1 for session in self._sessions.values() if session.user_id == user_id)
+            if owned >= self.max_per_user:
+                raise SessionLimitError(f"Session limit reached ({self.max_per_user} per user). Close a session first.")
+            evicted = self._evict_for(memory)
+            self._reserved += memory
+
+        for session in evicted:
+            logger.info("Evicting idle session %s to free memory", session.session_id)
+            self._close(session)
+
+        try:
+            session = self._open(user_id, language, config, memory)
+        finally:
+            with self._lock:
+                self._reserved -= memory
+
+        with self._lock:
+            self._sessions[session.session_id] = session
+            metrics.SESSIONS.set(len(self._sessions))
+        return session
+
+    def execute(self, session_id: str, user_id: str, code: str, stdin: Optional[str] = None) -> Dict[str, Any]:
+        session = self._get(session_id, user_id)
+        with session.lock:
+            if session.closed:
+                raise SessionNotFoundError(session_id)
+            session.busy = True
+            try:
+                return self._execute(session, code, stdin)
+            finally:
+                session.busy = False
+                session.last_used = time.monotonic()
+
+    def close(self, session_id: str, user_id: str):
+        session = self._get(session_id, user_id)
+        self._discard(session)
+
+    def list(self, user_id: str) -> List[Session]:
+        with self._lock:
+            return [session for session in self._sessions.values() if session.user_id == user_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "memory": sum(session.memory for session in self._sessions.values()),
+                "max_memory": self.max_memory,
+            }
+
+    def _get(self, session_id: str, user_id: str) -> Session:
+        with self._lock:
+            session = self._sessions.get(session_id)
+        # Other users' sessions are reported as missing rather than forbidden
+        if session is None or session.user_id != user_id:
+            raise SessionNotFoundError(session_id)
+        return session
+
+    def _evict_for(self, memory: int) -> List[Session]:
+        """Pick least recently used idle sessions until `memory` more bytes fit. Caller holds the lock."""
+        used = self._reserved + sum(session.memory for session in self._sessions.values())
+        if used + memory <= self.max_memory:
+            return []
+
+        evicted = []
+        idle = sorted((s for s in self._sessions.values() if not s.busy), key=lambda s: s.last_used)
+        for session in idle:
+            if used + memory <= self.max_memory:
+                break
+            evicted.append(session)
+            used -= session.memory
+        if used + memory > self.max_memory:
+            raise SessionLimitError("No capacity for another session. Please retry later.")
+
+        for session in evicted:
+            del self._sessions[session.session_id]
+        metrics.SESSIONS.set(len(self._sessions))
+        return evicted
+
+    def _open(self, user_id: str, language: str, config, memory: int) -> Session:
+        with open(os.path.join(DRIVER_DIR, config.repl_driver), "r") as f:
+            driver = f.read()
+        driver_path = f".repl/driver{os.path.splitext(config.repl_driver)[1]}"
+
+        sandbox = self.executor.open_sandbox(language)
+        try:
+            sandbox.put_files({driver_path: driver})
+            exit_code, _ = sandbox.run("mkfifo .repl/req .repl/resp")
+            if exit_code != 0:
+                raise SessionError("Failed to set up the session sandbox")
+            # Runs until the session is closed; it only talks through the FIFOs
+            process = sandbox.start(config.repl_cmd.format(driver=driver_path, max_output=self.executor.max_output_bytes))
+        except Exception:
+            self.executor.close_sandbox(sandbox)
+            raise
+
+        return Session(uuid.uuid4().hex, user_id, language, config, sandbox, process, memory)
+
+    def _execute(self, session: Session, code: str, stdin: Optional[str]) -> Dict[str, Any]:
+        start_time = time.time()
+        session.sandbox.put_files({".repl/in": json.dumps({"code": code, "stdin": stdin})})
+        exec_result = self.executor.run_in_sandbox(
+            session.sandbox,
+            REQUEST_CMD,
+            session.config.timeout,
+            max_output_bytes=REPLY_EXPANSION * self.executor.max_output_bytes + 1024,
+        )
+        execution_time = round(time.time() - start_time, 3)
+
+        if exec_result["timed_out"]:
+            # The interpreter may be stuck in the snippet, so the session cannot be reused
+            metrics.TIMEOUTS.inc(language=session.language)
+            self._discard(session)
+            return {
+                "stdout": "",
+                "stderr": "",
+                "execution_time": execution_time,
+                "error": f"Time limit exceeded ({session.config.timeout} seconds). The session was closed.",
+                "timed_out": True,
+                "truncated": False,
+            }
+
+        try:
+            reply = json.loads(exec_result["stdout"])
+        except ValueError:
+            self._discard(session)
+            raise SessionError("The session's interpreter exited. Please start a new session.")
+
+        return {**reply, "execution_time": execution_time, "timed_out": False}
+
+    def _discard(self, session: Session):
+        with self._lock:
+            if self._sessions.pop(session.session_id, None) is None:
+                return
+            metrics.SESSIONS.set(len(self._sessions))
+        self._close(session)
+
+    def _close(self, session: Session):
+        session.closed = True
+        try:
+            session.driver.kill()
+            # Drains (and so closes) the driver's output stream once it is gone
+            for _ in session.driver.output():
+                pass
+            session.driver.wait()
+        except Exception as e:
+            logger.warning("Failed to stop the interpreter of session %s: %s", session.session_id, e)
+        try:
+            self.executor.close_sandbox(session.sandbox)
+        except Exception as e:
+            logger.warning("Failed to release session %s: %s", session.session_id, e)
+
+    def _reap_loop(self):
+        while not self._stopped.wait(self.reap_interval):
+            cutoff = time.monotonic() - self.idle_timeout
+            with self._lock:
+                expired = [s for s in self._sessions.values() if not s.busy and s.last_used < cutoff]
+            for session in expired:
+                self._discard(session)
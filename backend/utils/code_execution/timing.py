@@ -0,0 +1,28 @@
+"""
+Per-phase wall-clock timings for a single execution
+(archive build, container create/start, upload, compile, exec, ...).
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class PhaseTimings:
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, duration: float):
+        """Add `duration` seconds to the phase, e.g. one timed elsewhere."""
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def as_dict(self) -> Dict[str, float]:
+        """Phase durations in seconds, rounded to microseconds."""
+        return {name: round(duration, 6) for name, duration in self.phases.items()}
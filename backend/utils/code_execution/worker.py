@@ -0,0 +1,122 @@
+"""
+Pool of worker processes that execute queued code execution jobs.
+Each process owns its own CodeExecutor (and container pool).
+
+Usage:
+    python -m utils.code_execution.worker --workers 4
+"""
+import logging
+import os
+import time
+import signal
+import socket
+import argparse
+import threading
+import multiprocessing
+from utils.code_execution.jobs import JobQueue
+from utils.code_execution.project import decode_files
+
+logger = logging.getLogger(__name__)
+
+
+def _keep_claim(queue: JobQueue, job_id: str, worker_id: str, interval: float, done: threading.Event):
+    """Heartbeat the job every `interval` seconds until `done` is set, so long batches are not re-claimed."""
+    while not done.wait(interval):
+        try:
+            if not queue.heartbeat(job_id, worker_id):
+                logger.warning("Worker %s lost its claim on job %s", worker_id, job_id)
+                return
+        except Exception:
+            logger.exception("Heartbeat for job %s failed", job_id)
+
+
+def process_job(executor, queue: JobQueue, job: dict, worker_id: str, heartbeat_interval: float):
+    payload = dict(job["payload"])
+    done = threading.Event()
+    heartbeat = threading.Thread(
+        target=_keep_claim, args=(queue, job["id"], worker_id, heartbeat_interval, done), daemon=True
+    )
+    heartbeat.start()
+    try:
+        # Project files travel through the queue as JSON; the API already validated them
+        payload["files"] = decode_files(payload.get("files"), max_bytes=float("inf"))
+        if job["kind"] == "batch":
+            result = executor.execute_batch(**payload)
+        else:
+            result = executor.execute(**payload)
+        queue.complete(job["id"], worker_id, result)
+    except Exception as e:
+        logger.exception("Job %s failed", job["id"])
+        queue.fail(job["id"], worker_id, str(e))
+    finally:
+        done.set()
+        heartbeat.join()
+
+
+def run_worker(worker_index: int, poll_interval: float):
+    from core.config import settings
+    from utils.code_execution.factory import create_executor, create_job_queue
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{worker_index}"
+    queue = create_job_queue()
+    executor = create_executor()
+    if settings.CODE_EXECUTION_PREPULL_IMAGES:
+        for language in executor.get_supported_languages():
+            try:
+                executor.prepare(language)
+            except Exception as e:
+                logger.warning("Preparing %s failed: %s", language, e)
+    logger.info("Code execution worker %s started", worker_id)
+
+    try:
+        while not stopping:
+            job = queue.claim(worker_id)
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            # Well within the stale timeout, so a heartbeat or two may be late
+            process_job(executor, queue, job, worker_id, settings.CODE_EXECUTION_JOB_STALE_AFTER / 3)
+    finally:
+        executor.shutdown()
+        logger.info("Code execution worker %s stopped", worker_id)
+
+
+def main():
+    from core.config import settings
+
+    parser = argparse.ArgumentParser(description="Run code execution job workers")
+    parser.add_argument("--workers", type=int, default=settings.CODE_EXECUTION_JOB_WORKERS)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(name)s: %(message)s")
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(index, args.poll_interval), daemon=False)
+        for index in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
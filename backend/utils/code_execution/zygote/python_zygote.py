@@ -0,0 +1,152 @@
+"""
+Zygote for Python sandboxes (see utils/code_execution/zygote/). Runs as PID 1
+of the container with commonly used modules already imported, reads run
+requests from the /zygote/ctl FIFO and forks a child per request, which
+re-applies the sandbox's resource limits and runs the file as __main__.
+A run then skips interpreter start-up and those imports.
+Standard library only: it runs with the sandbox image's interpreter.
+Usage: python -u python_zygote.py <timeout seconds> <memory bytes>
+"""
+import os
+import sys
+import errno
+import select
+import signal
+import resource
+import traceback
+
+# Imported once here, so submissions find them already in sys.modules
+import re, io, json, math, time, heapq, bisect, random, string, typing  # noqa: E401
+import decimal, fractions, datetime, itertools, functools, statistics, collections  # noqa: E401
+import runpy
+
+CTL = "/zygote/ctl"
+TIMEOUT = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+MEMORY = int(sys.argv[2]) if len(sys.argv) > 2 else 256 * 1024 ** 2
+MAX_FILE_SIZE = 16 * 1024 * 1024
+
+
+def run_child(run_dir, cwd, argv):
+    """Runs in the forked child; never returns."""
+    code = 1
+    try:
+        os.setsid()
+        os.chdir(cwd)
+        cpu_seconds = max(1, TIMEOUT)
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        resource.setrlimit(resource.RLIMIT_DATA, (MEMORY, MEMORY))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (MAX_FILE_SIZE, MAX_FILE_SIZE))
+        # No RLIMIT_NPROC: it would count every sandbox on the host running as the
+        # same user; the container's pids limit bounds processes instead
+
+        # Same order as the client opens them, so neither side blocks
+        for fd, name, flags in ((0, "in", os.O_RDONLY), (1, "out", os.O_WRONLY), (2, "err", os.O_WRONLY)):
+            os.dup2(os.open(os.path.join(run_dir, name), flags), fd)
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", buffering=1, closefd=False)
+        sys.argv = list(argv)
+        sys.path[0] = cwd
+        # Children must not share the zygote's random state
+        random.seed()
+        try:
+            runpy.run_path(argv[0], run_name="__main__")
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except BaseException as e:
+            # Hide the zygote's and runpy's frames from the traceback
+            tb = e.__traceback__
+            while tb is not None and tb.tb_frame.f_code.co_filename not in (argv[0], os.path.abspath(argv[0])):
+                tb = tb.tb_next
+            traceback.print_exception(type(e), e, tb)
+            code = 1
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                code = code or 1
+    finally:
+        os._exit(code & 0xFF)
+
+
+def report(run_dir, code):
+    """Hand the exit code to the client, unless it is gone (e.g. killed on timeout)."""
+    try:
+        fd = os.open(os.path.join(run_dir, "status"), os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        return
+    try:
+        os.write(fd, f"{code}\n".encode())
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def main():
+    # Read-write, so the FIFO never reports end-of-file between clients
+    ctl = os.open(CTL, os.O_RDWR)
+    # SIGCHLD wakes the loop through this pipe, so exits are reported at once
+    wakeup, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    children = {}  # pid -> run directory
+    buffer = b""
+    while True:
+        readable, _, _ = select.select([ctl, wakeup], [], [], 1.0)
+        if wakeup in readable:
+            os.read(wakeup, 4096)
+        if ctl in readable:
+            buffer += os.read(ctl, 4096)
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                parts = line.decode().split()
+                if len(parts) < 3:
+                    continue
+                run_dir, cwd, argv = parts[0], parts[1], parts[2:]
+                try:
+                    pid = os.fork()
+                except OSError as e:
+                    print(f"zygote: fork failed: {e}", file=sys.stderr)
+                    # Close the client's output FIFOs so it does not wait for a child that never ran
+                    for name in ("out", "err"):
+                        try:
+                            os.close(os.open(os.path.join(run_dir, name), os.O_WRONLY | os.O_NONBLOCK))
+                        except OSError:
+                            pass
+                    report(run_dir, 1)
+                    continue
+                if pid == 0:
+                    signal.set_wakeup_fd(-1)
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    for fd in (ctl, wakeup, wakeup_w):
+                        os.close(fd)
+                    run_child(run_dir, cwd, argv)
+                children[pid] = run_dir
+
+        # As PID 1 the zygote also reaps whatever gets orphaned in the container
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as e:
+                if e.errno == errno.ECHILD:
+                    break
+                raise
+            if pid == 0:
+                break
+            if pid in children:
+                code = os.waitstatus_to_exitcode(status)
+                # Like a shell: killed by SIGKILL -> 137
+                report(children.pop(pid), 128 - code if code < 0 else code)
+
+
+if __name__ == "__main__":
+    main()
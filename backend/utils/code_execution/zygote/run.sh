@@ -0,0 +1,19 @@
+# Client for the zygote running as PID 1 of a sandbox container (see
+# utils/code_execution/zygote/). Usage: sh /zygote/run.sh <file> [args...]
+# Hands the run to the zygote over /zygote/ctl and relays the child's stdin,
+# stdout, stderr and exit status through per-run FIFOs.
+# Under /tmp, so the workspace wipe clears what a killed run leaves behind
+d=$(mktemp -d /tmp/zygote.XXXXXX) || exit 1
+mkfifo "$d/in" "$d/out" "$d/err" "$d/status" || exit 1
+# Opened read-write so the zygote can report the status whenever the child exits
+exec 3<>"$d/status"
+# Through a copy of fd 0: an asynchronous command would otherwise read /dev/null
+exec 4<&0
+cat <&4 > "$d/in" &
+cat "$d/err" >&2 &
+echo "$d $PWD $*" > /zygote/ctl
+cat "$d/out"
+wait
+read -r code <&3
+rm -rf "$d"
+exit "${code:-1}"
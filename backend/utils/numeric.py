@@ -0,0 +1,19 @@
+"""
+Small numeric helpers shared by the code execution and OpenRouter modules.
+"""
+from typing import List
+
+
+def parse_memory(value: str) -> int:
+    """Convert a Docker-style memory string ("256m", "1g") to bytes."""
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    value = value.strip().lower()
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def quantile(values: List[float], q: float) -> float:
+    """The `q` quantile (0..1) of a non-empty list, by nearest rank."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
@@ -1,48 +1,69 @@
 # llm.py
+import logging
 import os
+import json
 import time
-import random
+import hashlib
+import contextlib
 from dotenv import load_dotenv
+from openai.types.chat import ChatCompletion
 
+from core.config import settings
 from utils.constants import constants, LLMModels
 from utils.openrouter.router import openrouter_client
+from utils.openrouter.limiter import ProviderLimiter, provider_of
+from utils.openrouter.response_cache import (
+    InMemoryResponseCacheBackend,
+    ResponseCache,
+    SQLiteResponseCacheBackend,
+)
+from utils.openrouter.single_flight import SingleFlight
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+provider_limiter = ProviderLimiter(
+    max_concurrency=settings.OPENROUTER_PROVIDER_CONCURRENCY,
+    rate=settings.OPENROUTER_PROVIDER_RATE,
+)
+
+response_cache = None
+if settings.LLM_CACHE_SIZE > 0:
+    response_cache = ResponseCache(
+        InMemoryResponseCacheBackend(max_entries=settings.LLM_CACHE_SIZE),
+        persistent=SQLiteResponseCacheBackend(settings.LLM_CACHE_DB_PATH) if settings.LLM_CACHE_DB_PATH else None,
+        ttl=settings.LLM_CACHE_TTL,
+        max_temperature=settings.LLM_CACHE_MAX_TEMPERATURE,
+    )
+
+single_flight = SingleFlight() if settings.LLM_SINGLE_FLIGHT else None
+
 
 def get_random_model():
     models = [LLMModels.CLAUDE.value, LLMModels.DEEPSEEK.value, LLMModels.GEMINI.value, LLMModels.OPENAI.value, LLMModels.PERPLEXITY.value]
-    return random.choice(models)
+    return openrouter_client.choose_model(models)
 
 
 def get_web_search_model():
-    return random.choice([LLMModels.GEMINI.value, LLMModels.PERPLEXITY.value, LLMModels.XAI.value, LLMModels.CLAUDE.value, LLMModels.OPENAI.value])
+    return openrouter_client.choose_model([LLMModels.GEMINI.value, LLMModels.PERPLEXITY.value, LLMModels.XAI.value, LLMModels.CLAUDE.value, LLMModels.OPENAI.value])
 
 
-def rate_limit():
-    print("Sleeping for 1 second")
-    time.sleep(1)
-
-
-def text_completion_with_tracing(
-    messages: list, 
-    model: str = LLMModels.GEMINI.value, 
-    temperature: float = constants.DEFAULT_TEMPERATURE, 
-    metadata: dict = {}, 
-    rate_limit_enabled: bool = True, 
-    enable_web_search: bool = False,
-    web_search_engine: str = None,  # "native", "exa", or None for auto
-    web_search_max_results: int = 5,
-    web_search_context_size: str = "low"
-):
+def _completion_params(
+    messages: list,
+    model: str,
+    temperature: float,
+    metadata: dict,
+    enable_web_search: bool,
+    web_search_engine: str,
+    web_search_max_results: int,
+    web_search_context_size: str,
+) -> dict:
     print(f"Model before: {model} enable_web_search: {enable_web_search}")
     
     if model == "random":
         model = get_random_model()
 
-    if rate_limit_enabled:
-        rate_limit()
-
     # If web search models requested, pick a compatible model
     if model == "web_search_models":
         model = get_web_search_model()
@@ -60,14 +81,180 @@ def text_completion_with_tracing(
         completion_params["web_search_engine"] = web_search_engine
         completion_params["web_search_max_results"] = web_search_max_results
         completion_params["web_search_context_size"] = web_search_context_size
+    return completion_params
+
+
+def _cache_keys(requested_model: str, completion_params: dict):
+    """Cache keys for the request, or None if it must not be served from the cache."""
+    if response_cache is None:
+        return None
+    if response_cache.bypass(requested_model, completion_params["temperature"]):
+        response_cache.count_bypass()
+        return None
+    web_search = {
+        name: value for name, value in completion_params.items()
+        if name.startswith("web_search") or name == "enable_web_search"
+    }
+    return response_cache.keys(
+        openrouter_client.get_openrouter_model(completion_params["model"]),
+        completion_params["messages"],
+        completion_params["temperature"],
+        web_search,
+    )
+
+
+def _flight_key(completion_params: dict, stream: bool) -> str:
+    """Identifies requests that may share one upstream call: same resolved model, messages and parameters."""
+    payload = json.dumps(
+        {name: value for name, value in completion_params.items() if name != "metadata"},
+        sort_keys=True,
+        default=str,
+    )
+    return f"{'stream' if stream else 'completion'}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def _provider_slot(model: str, rate_limit_enabled: bool):
+    if not rate_limit_enabled:
+        return contextlib.nullcontext()
+    return provider_limiter.limit(provider_of(openrouter_client.get_openrouter_model(model)))
+
+
+async def _request(completion_params: dict, cache_keys, rate_limit_enabled: bool):
+    async with _provider_slot(completion_params["model"], rate_limit_enabled):
+        response = await openrouter_client.completion(
+            **completion_params, provider_limiter=provider_limiter if rate_limit_enabled else None
+        )
+    # Only complete answers are worth repeating
+    if cache_keys and response.choices and response.choices[0].finish_reason == "stop":
+        await response_cache.set(cache_keys, response.model_dump())
+    return response
+
+
+async def text_completion_with_tracing(
+    messages: list, 
+    model: str = LLMModels.GEMINI.value, 
+    temperature: float = constants.DEFAULT_TEMPERATURE, 
+    metadata: dict = {}, 
+    rate_limit_enabled: bool = True, 
+    enable_web_search: bool = False,
+    web_search_engine: str = None,  # "native", "exa", or None for auto
+    web_search_max_results: int = 5,
+    web_search_context_size: str = "low"
+):
+    completion_params = _completion_params(
+        messages, model, temperature, metadata,
+        enable_web_search, web_search_engine, web_search_max_results, web_search_context_size,
+    )
+    cache_keys = _cache_keys(model, completion_params)
+    model = completion_params["model"]
 
     try:
-        response = openrouter_client.completion(**completion_params)
+        cached = await response_cache.get(cache_keys) if cache_keys else None
+        if cached is not None:
+            response = ChatCompletion.model_validate(cached)
+        elif single_flight is not None:
+            response = await single_flight.do(
+                _flight_key(completion_params, stream=False),
+                lambda: _request(completion_params, cache_keys, rate_limit_enabled),
+            )
+        else:
+            response = await _request(completion_params, cache_keys, rate_limit_enabled)
         
         if metadata.get("trace_name") == "question":
             actual_model = response.model if hasattr(response, 'model') else model
             return response, actual_model
         return response
-    except Exception as e:
-        print(f"Error: {e}")
-        raise e
\ No newline at end of file
+    except Exception:
+        logger.exception("Completion with %s failed", model)
+        raise
+
+
+async def stream_completion_with_tracing(
+    messages: list,
+    model: str = LLMModels.GEMINI.value,
+    temperature: float = constants.DEFAULT_TEMPERATURE,
+    metadata: dict = {},
+    rate_limit_enabled: bool = True,
+    enable_web_search: bool = False,
+    web_search_engine: str = None,  # "native", "exa", or None for auto
+    web_search_max_results: int = 5,
+    web_search_context_size: str = "low"
+):
+    """
+    Same as text_completion_with_tracing, but yields ("token", text) as the
+    model generates and finally ("done", {"model", "usage", "finish_reason", "cached"}),
+    where model is the one that actually answered (it may be a fallback).
+    The provider slot is held until the stream ends. A cached response is
+    sent as a single token; identical concurrent streams share one upstream
+    call and receive the same tokens.
+    """
+    completion_params = _completion_params(
+        messages, model, temperature, metadata,
+        enable_web_search, web_search_engine, web_search_max_results, web_search_context_size,
+    )
+    cache_keys = _cache_keys(model, completion_params)
+    model = completion_params["model"]
+
+    cached = await response_cache.get(cache_keys) if cache_keys else None
+    if cached is not None:
+        choice = cached["choices"][0]
+        yield "token", choice["message"]["content"] or ""
+        yield "done", {"model": cached["model"], "usage": cached.get("usage"), "finish_reason": choice["finish_reason"], "cached": True}
+        return
+
+    if single_flight is None:
+        upstream = _stream(completion_params, cache_keys, rate_limit_enabled)
+    else:
+        upstream = single_flight.stream(
+            _flight_key(completion_params, stream=True),
+            lambda: _stream(completion_params, cache_keys, rate_limit_enabled),
+        )
+    async with contextlib.aclosing(upstream) as events:
+        async for event in events:
+            yield event
+
+
+async def _stream(completion_params: dict, cache_keys, rate_limit_enabled: bool):
+    model = completion_params["model"]
+    async with _provider_slot(model, rate_limit_enabled):
+        start = time.monotonic()
+        try:
+            stream = await openrouter_client.completion(**completion_params, stream=True)
+        except Exception:
+            logger.exception("Streaming completion with %s failed", model)
+            raise
+
+        actual_model = openrouter_client.get_openrouter_model(model)
+        usage = None
+        finish_reason = None
+        tokens = []
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "model", None):
+                    actual_model = chunk.model
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage.model_dump()
+                for choice in chunk.choices or []:
+                    if choice.finish_reason:
+                        finish_reason = choice.finish_reason
+                    if choice.delta and choice.delta.content:
+                        tokens.append(choice.delta.content)
+                        yield "token", choice.delta.content
+        except Exception:
+            openrouter_client.record(model, time.monotonic() - start, ok=False)
+            raise
+        finally:
+            await stream.close()
+        # Not reached for a stream the client abandoned, which says nothing about the model
+        openrouter_client.record(openrouter_client.get_model_key(actual_model, model), time.monotonic() - start)
+
+    if cache_keys and finish_reason == "stop":
+        await response_cache.set(cache_keys, {
+            "id": f"cached-{int(time.time())}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": actual_model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": finish_reason}],
+            "usage": usage,
+        })
+    yield "done", {"model": actual_model, "usage": usage, "finish_reason": finish_reason, "cached": False}
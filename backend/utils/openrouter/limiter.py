@@ -0,0 +1,99 @@
+# limiter.py
+"""
+Per-provider throttling for OpenRouter calls. Each provider (the part of the
+OpenRouter model id before the slash, e.g. "google") gets a cap on concurrent
+requests and a token bucket for its request rate. Waiting happens on the
+event loop, so a throttled request never blocks other requests.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+
+def provider_of(openrouter_model: Optional[str]) -> str:
+    """"google/gemini-2.5-flash" -> "google"."""
+    if not openrouter_model:
+        return "default"
+    return openrouter_model.split("/", 1)[0]
+
+
+class _Provider:
+    def __init__(self, max_concurrency: int, rate: float, burst: float):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = None
+        self.lock = asyncio.Lock()
+
+    def available(self, now: float) -> float:
+        """Tokens in the bucket at loop time `now`."""
+        if self.updated is None:
+            return self.tokens
+        return min(self.burst, self.tokens + (now - self.updated) * self.rate)
+
+    async def take(self):
+        """Wait for a token. Waiters queue on the lock, so they are served in order."""
+        if self.rate <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            while True:
+                now = loop.time()
+                self.tokens = self.available(now)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ProviderLimiter:
+    """
+    At most `max_concurrency` requests in flight and `rate` requests per second
+    (bursts of up to `burst`) per provider; rate <= 0 disables the rate limit.
+    """
+
+    def __init__(self, max_concurrency: int = 8, rate: float = 5.0, burst: Optional[float] = None):
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._providers: Dict[str, _Provider] = {}
+
+    def _provider(self, provider: str) -> _Provider:
+        state = self._providers.get(provider)
+        if state is None:
+            state = _Provider(self.max_concurrency, self.rate, self.burst)
+            self._providers[provider] = state
+        return state
+
+    @asynccontextmanager
+    async def limit(self, provider: str):
+        """Hold a slot for one request to `provider` for the duration of the block."""
+        state = self._provider(provider)
+        async with state.semaphore:
+            await state.take()
+            state.in_flight += 1
+            try:
+                yield
+            finally:
+                state.in_flight -= 1
+
+    def has_capacity(self, provider: str) -> bool:
+        """Whether a request to `provider` would start right away: a slot is free and a token is left."""
+        state = self._provider(provider)
+        if state.semaphore.locked():
+            return False
+        if state.rate <= 0:
+            return True
+        return not state.lock.locked() and state.available(asyncio.get_running_loop().time()) >= 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            provider: {
+                "in_flight": state.in_flight,
+                "tokens": round(state.tokens, 2),
+            }
+            for provider, state in self._providers.items()
+        }
@@ -0,0 +1,25 @@
+"""
+Prometheus metrics for LLM completions, rendered by /metrics together with
+the code execution metrics (same registry).
+"""
+from utils.code_execution.metrics import Counter, Histogram
+
+CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups_total",
+    "LLM response cache lookups by result (exact_hits, normalized_hits, misses, bypassed).",
+    ["result"],
+)
+REQUEST_SECONDS = Histogram(
+    "llm_request_seconds", "Latency of LLM requests by the model that answered.", ["model"],
+    buckets=(0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0, 120.0),
+)
+REQUEST_ERRORS = Counter("llm_request_errors_total", "Failed LLM requests.", ["model"])
+HEDGED_REQUESTS = Counter(
+    "llm_hedged_requests_total", "Requests hedged to the fallback model, by which one answered first.", ["winner"]
+)
+HEDGES_SKIPPED = Counter(
+    "llm_hedges_skipped_total", "Hedges not sent because the fallback's provider had no free slot.", ["provider"]
+)
+COALESCED_REQUESTS = Counter(
+    "llm_coalesced_requests_total", "Requests that joined an identical in-flight request instead of calling the model.", ["kind"]
+)
@@ -0,0 +1,85 @@
+# model_stats.py
+"""
+Rolling latency and error rate per model_map entry, used to route "random"
+and "web_search_models" requests toward the fastest healthy models and to
+decide when a slow request is worth hedging.
+"""
+import random
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+from utils.numeric import quantile
+
+
+class ModelStats:
+    """
+    Keeps the last `window` outcomes per model. A model whose error rate is
+    above `max_error_rate` is unhealthy; models with fewer than `min_samples`
+    successes have no latency estimate yet.
+    """
+
+    def __init__(self, window: int = 100, min_samples: int = 10, max_error_rate: float = 0.5, probe_share: float = 0.05):
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.probe_share = probe_share
+        self._lock = threading.Lock()
+        self._latencies = {}  # model key -> deque of seconds for successful requests
+        self._outcomes = {}  # model key -> deque of True (ok) / False (error)
+
+    def record(self, model: str, latency: float, ok: bool = True):
+        with self._lock:
+            self._outcomes.setdefault(model, deque(maxlen=self.window)).append(ok)
+            if ok:
+                self._latencies.setdefault(model, deque(maxlen=self.window)).append(latency)
+
+    def latency(self, model: str, q: float = 0.5) -> Optional[float]:
+        with self._lock:
+            latencies = list(self._latencies.get(model, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        return quantile(latencies, q)
+
+    def error_rate(self, model: str) -> float:
+        with self._lock:
+            outcomes = list(self._outcomes.get(model, ()))
+        if not outcomes:
+            return 0.0
+        return outcomes.count(False) / len(outcomes)
+
+    def healthy(self, model: str) -> bool:
+        return self.error_rate(model) <= self.max_error_rate
+
+    def choose(self, models: List[str]) -> str:
+        """
+        Pick a model, weighted by success rate over median latency, so the
+        fastest healthy ones get most of the traffic. Models without enough
+        samples are weighted like the best one, so they keep being measured;
+        unhealthy ones get `probe_share` of the best weight, so they can recover.
+        """
+        weights = {}
+        for model in models:
+            latency = self.latency(model)
+            if latency is not None:
+                weights[model] = (1 - self.error_rate(model)) / max(latency, 0.001)
+        best = max(weights.values(), default=1.0)
+
+        def weight(model: str) -> float:
+            if not self.healthy(model):
+                return best * self.probe_share
+            return weights.get(model, best)
+
+        return random.choices(models, weights=[weight(model) for model in models])[0]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            models = list(self._outcomes)
+        return {
+            model: {
+                "p50": self.latency(model, 0.5),
+                "p95": self.latency(model, 0.95),
+                "error_rate": round(self.error_rate(model), 3),
+                "healthy": self.healthy(model),
+            }
+            for model in models
+        }
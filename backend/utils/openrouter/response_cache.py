@@ -0,0 +1,237 @@
+# response_cache.py
+"""
+Cache of LLM responses for repeated prompts (labs send the same hint and
+explanation prompts over and over). Keys cover the resolved model, the
+messages, the temperature and the web search settings. A second, normalized
+key (case and whitespace folded) catches prompts that differ only in
+formatting. Entries live in a per-process LRU, optionally backed by a
+persistent store shared by workers (SQLite locally).
+"""
+import logging
+import re
+import asyncio
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from utils.openrouter import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheBackend:
+    """Storage interface; implement this to share the cache across workers or hosts."""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryResponseCacheBackend(ResponseCacheBackend):
+    """Per-process LRU with a per-entry expiry time."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteResponseCacheBackend(ResponseCacheBackend):
+    """Entries in a SQLite file, shared by the workers on one host; least recently used go first."""
+
+    # Expired and surplus rows are deleted at most this often
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._last_prune = 0.0
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        row = self._connect().execute(
+            "UPDATE llm_responses SET used_at = ? WHERE key = ? AND expires_at > ? RETURNING value",
+            (now, key, now),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO llm_responses (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now),
+        )
+        self._prune(now)
+
+    def size(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM llm_responses WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+    def _prune(self, now: float):
+        if now - self._last_prune < self.PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        conn = self._connect()
+        conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+        conn.execute(
+            """
+            DELETE FROM llm_responses WHERE key IN (
+                SELECT key FROM llm_responses ORDER BY used_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class ResponseCache:
+    """
+    Looks up the exact key first, then the normalized one. `persistent` sits
+    behind the in-process LRU; its hits are copied into the LRU. It is only
+    called from worker threads, so a busy store never blocks the event loop.
+    Responses to temperatures above `max_temperature` are not cached.
+    """
+
+    def __init__(
+        self,
+        memory: ResponseCacheBackend,
+        persistent: Optional[ResponseCacheBackend] = None,
+        ttl: float = 86400,
+        max_temperature: float = 1.0,
+    ):
+        self.memory = memory
+        self.persistent = persistent
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "normalized_hits": 0, "misses": 0, "bypassed": 0}
+
+    def bypass(self, requested_model: str, temperature: float) -> bool:
+        """Random model routing and high temperatures ask for varied answers."""
+        return requested_model in ("random", "web_search_models") or temperature > self.max_temperature
+
+    @staticmethod
+    def keys(model: str, messages: list, temperature: float, web_search: Dict[str, Any]) -> Tuple[str, str]:
+        """(exact key, normalized key) for a request."""
+        def digest(msgs) -> str:
+            payload = json.dumps(
+                {"model": model, "messages": msgs, "temperature": temperature, "web_search": web_search},
+                sort_keys=True,
+                default=str,
+            )
+            return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+        normalized = [
+            {**message, "content": _normalize(message["content"])} if isinstance(message.get("content"), str) else message
+            for message in messages
+        ]
+        return f"exact:{digest(messages)}", f"normalized:{digest(normalized)}"
+
+    async def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            try:
+                value = await asyncio.to_thread(self.persistent.get, key)
+            except sqlite3.Error as e:
+                logger.warning("LLM response cache: failed to read entry: %s", e)
+                return None
+            if value is not None:
+                self.memory.set(key, value, self.ttl)
+        return value
+
+    async def get(self, keys: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        exact, normalized = keys
+        value = await self._get(exact)
+        match = "exact"
+        if value is None:
+            value = await self._get(normalized)
+            match = "normalized"
+        self._count("misses" if value is None else f"{match}_hits")
+        return value
+
+    async def set(self, keys: Tuple[str, str], value: Dict[str, Any]):
+        for key in keys:
+            self.memory.set(key, value, self.ttl)
+        if self.persistent is not None:
+            try:
+                await asyncio.to_thread(self._persist, keys, value)
+            except sqlite3.Error as e:
+                logger.warning("LLM response cache: failed to persist entry: %s", e)
+
+    def _persist(self, keys: Tuple[str, str], value: Dict[str, Any]):
+        for key in keys:
+            self.persistent.set(key, value, self.ttl)
+
+    def count_bypass(self):
+        self._count("bypassed")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+        metrics.CACHE_LOOKUPS.inc(result=name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["exact_hits"] + stats["normalized_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["normalized_hits"]) / lookups, 3) if lookups else None
+        stats["entries"] = self.memory.size()
+        return stats
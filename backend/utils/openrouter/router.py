@@ -1,16 +1,36 @@
 # openrouter.py
+import logging
+import time
+import asyncio
+import httpx
+from typing import Optional
 from langfuse.openai import openai
 from dotenv import load_dotenv
 from core.config import settings
+from utils.openrouter import metrics
+from utils.openrouter.model_stats import ModelStats
+from utils.openrouter.limiter import ProviderLimiter, provider_of
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class OpenRouterClient:
     def __init__(self):
-        self.client = openai.OpenAI(
+        # One connection pool shared by every request, so concurrent completions
+        # reuse warm TLS connections instead of opening new ones
+        self.client = openai.AsyncOpenAI(
             base_url="https://openrouter.ai/api/v1",
             api_key=settings.OPENROUTER_API_KEY,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.OPENROUTER_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENROUTER_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.OPENROUTER_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(settings.OPENROUTER_TIMEOUT, connect=settings.OPENROUTER_CONNECT_TIMEOUT),
+            ),
         )
         
         self.model_map = {
@@ -32,10 +52,37 @@ class OpenRouterClient:
             "claude": ["deepseek"],
         }
         self.native_search_providers = ["openai", "claude", "perplexity", "xai"]
+        
+        self.stats = ModelStats(
+            window=settings.OPENROUTER_STATS_WINDOW,
+            min_samples=settings.OPENROUTER_STATS_MIN_SAMPLES,
+            max_error_rate=settings.OPENROUTER_MAX_ERROR_RATE,
+        )
+        # Send a second request to the fallback model once the primary is slower than its p95
+        self.hedge_requests = settings.OPENROUTER_HEDGE_REQUESTS
     
     def get_openrouter_model(self, model_key: str) -> str:
         return self.model_map.get(model_key)
     
+    def get_model_key(self, openrouter_model: str, default: str = None) -> str:
+        """"google/gemini-2.5-flash" -> "gemini"."""
+        for key, value in self.model_map.items():
+            if value == openrouter_model:
+                return key
+        return default
+    
+    def choose_model(self, model_keys: list) -> str:
+        """Pick among `model_keys`, favouring the currently fastest healthy ones."""
+        return self.stats.choose(model_keys)
+    
+    def record(self, model_key: str, latency: float, ok: bool = True):
+        """Feed the outcome of a request into the routing statistics."""
+        self.stats.record(model_key, latency, ok)
+        if ok:
+            metrics.REQUEST_SECONDS.observe(latency, model=model_key)
+        else:
+            metrics.REQUEST_ERRORS.inc(model=model_key)
+    
     def get_fallback_models(self, primary_model: str) -> list:
         fallback_keys = self.fallbacks.get(primary_model, [])
         return [self.get_openrouter_model(fb) for fb in fallback_keys]
@@ -43,8 +90,10 @@ class OpenRouterClient:
     def supports_native_search(self, model_key: str) -> bool:
         return model_key in self.native_search_providers
     
-    def completion(self, model: str, messages: list, temperature: float = 0.7, metadata: dict = None, enable_web_search: bool = False, web_search_engine: str = None, web_search_max_results: int = 5, web_search_context_size: str = "low", **kwargs):
+    async def completion(self, model: str, messages: list, temperature: float = 0.7, metadata: dict = None, enable_web_search: bool = False, web_search_engine: str = None, web_search_max_results: int = 5, web_search_context_size: str = "low", stream: bool = False, provider_limiter: Optional[ProviderLimiter] = None, **kwargs):
         # web_search_engine: "native", "exa", or None for auto
+        # stream=True returns an async iterator of chunks; the last one carries usage
+        # provider_limiter throttles hedges to the fallback's provider (the caller holds the primary's slot)
         primary_model = self.get_openrouter_model(model)
         fallback_models = self.get_fallback_models(model)
         
@@ -88,16 +137,105 @@ class OpenRouterClient:
         
         request_params["name"] = metadata.get("trace_name", "api_completion")
         
+        if stream:
+            request_params["stream"] = True
+            request_params["stream_options"] = {"include_usage": True}
+            # Latency of streams is recorded by the caller once they finish
+            try:
+                return await self.client.chat.completions.create(
+                    **request_params,
+                    extra_headers=extra_headers,
+                    **kwargs
+                )
+            except Exception as e:
+                logger.warning("Error with OpenRouter for %s: %s", model, e, exc_info=True)
+                self.record(model, 0.0, ok=False)
+                raise e
+        
+        hedge_after = self.stats.latency(model, 0.95) if self.hedge_requests and self.fallbacks.get(model) else None
+        if hedge_after is None:
+            return await self._create(model, request_params, extra_headers, kwargs)
+        
+        fallback = self.fallbacks[model][0]
+        hedge_params = {**request_params, "model": self.get_openrouter_model(fallback)}
+        hedge_extra_body = {key: value for key, value in extra_body.items() if key != "models"}
+        if hedge_extra_body:
+            hedge_params["extra_body"] = hedge_extra_body
+        else:
+            hedge_params.pop("extra_body", None)
+        return await self._hedged(
+            model, request_params, fallback, hedge_params, hedge_after, extra_headers, kwargs, provider_limiter
+        )
+    
+    async def _create(self, model: str, request_params: dict, extra_headers: dict, kwargs: dict):
+        start = time.monotonic()
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 **request_params,
                 extra_headers=extra_headers,
                 **kwargs
             )
-            return response
+        except asyncio.CancelledError:
+            # Lost a hedge race or the caller went away: how long it would have
+            # taken is unknown, and counting it as done now would skew the quantiles
+            raise
         except Exception as e:
-            print(f"Error with OpenRouter: {e}")
+            logger.warning("Error with OpenRouter for %s: %s", model, e, exc_info=True)
+            self.record(model, time.monotonic() - start, ok=False)
             raise e
+        # Credited to the model that answered, which may be one of the fallbacks
+        self.record(self.get_model_key(getattr(response, "model", None), model), time.monotonic() - start)
+        return response
+    
+    async def _hedged(
+        self, model: str, request_params: dict, fallback: str, hedge_params: dict, hedge_after: float,
+        extra_headers: dict, kwargs: dict, provider_limiter: Optional[ProviderLimiter] = None,
+    ):
+        """
+        Race the primary against a request to `fallback` started `hedge_after`
+        seconds later. With `provider_limiter`, the hedge takes a slot from the
+        fallback's provider and is skipped if none is free right away.
+        """
+        primary = asyncio.create_task(self._create(model, request_params, extra_headers, kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if primary in done:
+                return primary.result()
+            
+            provider = provider_of(hedge_params["model"])
+            if provider_limiter is None:
+                hedge_request = self._create(fallback, hedge_params, extra_headers, kwargs)
+            elif provider_limiter.has_capacity(provider):
+                hedge_request = self._limited(
+                    provider_limiter, provider, lambda: self._create(fallback, hedge_params, extra_headers, kwargs)
+                )
+            else:
+                # Hedging is optional; it must not take a slot a first attempt is waiting for
+                metrics.HEDGES_SKIPPED.inc(provider=provider)
+                return await primary
+            hedge = asyncio.create_task(hedge_request)
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        metrics.HEDGED_REQUESTS.inc(winner="primary" if task is primary else "hedge")
+                        return task.result()
+            # Both failed: report the primary's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    async def _limited(provider_limiter: ProviderLimiter, provider: str, request):
+        async with provider_limiter.limit(provider):
+            return await request()
+
+    async def aclose(self):
+        """Close the pooled connections."""
+        await self.client.close()
 
 
 openrouter_client = OpenRouterClient()
\ No newline at end of file
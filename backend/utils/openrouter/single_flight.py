@@ -0,0 +1,111 @@
+# single_flight.py
+"""
+Coalescing of identical in-flight LLM requests. When a class asks the same
+question at the same moment, the first request goes upstream and the others
+wait for its result; streams are fanned out, late joiners first getting the
+tokens already produced. The upstream call is cancelled only once every
+caller has gone. Use from the event loop only.
+"""
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+from utils.openrouter import metrics
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _Stream:
+    def __init__(self):
+        self.events = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Stream] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return `await fn()`, sharing one call among concurrent callers with the same key."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+        else:
+            metrics.COALESCED_REQUESTS.inc(kind="completion")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                self._forget(self._calls, key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Yield the events of `factory()`, sharing one upstream iteration among concurrent callers."""
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _Stream()
+            self._streams[key] = flight
+            flight.task = asyncio.create_task(self._produce(key, flight, factory))
+        else:
+            metrics.COALESCED_REQUESTS.inc(kind="stream")
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: len(flight.events) > index or flight.done)
+                    events = flight.events[index:]
+                    finished = flight.done
+                index += len(events)
+                for event in events:
+                    yield event
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more
+                self._forget(self._streams, key, flight)
+                flight.task.cancel()
+
+    async def _produce(self, key: str, flight: _Stream, factory: Callable[[], AsyncIterator[Any]]):
+        try:
+            async with contextlib.aclosing(factory()) as events:
+                async for event in events:
+                    async with flight.changed:
+                        flight.events.append(event)
+                        flight.changed.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            # A new request for the same key starts a fresh call from here on
+            self._forget(self._streams, key, flight)
+            flight.done = True
+            async with flight.changed:
+                flight.changed.notify_all()
+
+    @staticmethod
+    def _forget(flights: Dict[str, Any], key: str, flight):
+        if flights.get(key) is flight:
+            del flights[key]
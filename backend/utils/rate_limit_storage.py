@@ -0,0 +1,223 @@
+"""
+Shared storage for the slowapi rate limiter, so every worker process counts
+against the same limits. Registered with `limits` as URI schemes:
+
+- sqlite:///file.db (relative) or sqlite:////abs/file.db: counters in a SQLite
+  file, for the workers on one host
+- cached+<uri> (e.g. cached+redis://host:6379): keeps counters in the process
+  and syncs them with <uri> in the background, so requests never wait on the
+  shared store (the default, see RATE_LIMIT_SYNC_INTERVAL)
+
+Across hosts use the `redis://` storage built into `limits` (it needs the
+`redis` client installed).
+"""
+import logging
+import time
+import sqlite3
+import threading
+from limits.storage import Storage, storage_from_string
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window counters in a SQLite file; each update is a single atomic upsert."""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    # Expired rows are deleted at most this often
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # Same convention as SQLAlchemy: three slashes for a relative path, four for an absolute one
+        self.path = uri[len("sqlite:///"):] or ":memory:"
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        # A counter whose window has passed starts over
+        row = self._connect().execute(
+            """
+            INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,
+                expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+            RETURNING count
+            """,
+            (key, amount, now + expiry, now, now),
+        ).fetchone()
+        self._purge(now)
+        return row[0]
+
+    def get(self, key: str) -> int:
+        row = self._connect().execute(
+            "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._connect().execute(
+            "SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            self._connect().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        return self._connect().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        self._connect().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def _purge(self, now: float):
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        self._connect().execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+
+
+class _Entry:
+    def __init__(self, count: int, expires_at: float, expiry: int):
+        self.count = count  # Shared count as of the last sync, plus local hits since
+        self.pending = 0  # Local hits not yet written to the shared store
+        self.expires_at = expires_at
+        self.expiry = expiry
+
+
+class LocalCacheStorage(Storage):
+    """
+    Fronts another storage with per-process counters. Hits are counted
+    locally and written back every `sync_interval` seconds with one atomic
+    increment per key, which also brings in other workers' hits; the request
+    path never touches the shared store. Between syncs (and before the first
+    sync of a key) a worker may let through a few more requests than the
+    limit allows.
+    """
+
+    STORAGE_SCHEME = ["cached+memory", "cached+sqlite", "cached+redis", "cached+rediss", "cached+memcached"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, sync_interval: float = 0.25, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.backend = storage_from_string(uri[len("cached+"):], **options)
+        self.sync_interval = float(sync_interval)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._thread = threading.Thread(target=self._sync_loop, name="rate-limit-sync", daemon=True)
+        self._thread.start()
+
+    @property
+    def base_exceptions(self):
+        return self.backend.base_exceptions
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= now:
+                # Other workers' hits in this window arrive with the next sync
+                entry = self._entries[key] = _Entry(0, now + expiry, expiry)
+            entry.pending += amount
+            entry.count += amount
+            return entry.count
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.time():
+                return entry.count
+        return self.backend.get(key)
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.time():
+                return entry.expires_at
+        return self.backend.get_expiry(key)
+
+    def check(self) -> bool:
+        return self.backend.check()
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+        return self.backend.reset()
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        self.backend.clear(key)
+
+    def sync(self):
+        """Write pending local hits to the shared store and refresh the counts."""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+                del self._entries[key]
+            pending = [(key, entry.pending, entry.expiry) for key, entry in self._entries.items() if entry.pending]
+            for key, _, _ in pending:
+                self._entries[key].pending = 0
+
+        for key, amount, expiry in pending:
+            try:
+                count = self.backend.incr(key, expiry, amount)
+            except Exception as e:
+                logger.warning("Rate limit sync failed for %s: %s", key, e)
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        entry.pending += amount  # Retry on the next sync
+                continue
+            # A window other workers opened earlier ends earlier than ours
+            expires_at = None
+            if count != amount:
+                try:
+                    expires_at = self.backend.get_expiry(key)
+                except Exception as e:
+                    logger.warning("Rate limit sync failed for %s: %s", key, e)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    # Hits counted locally while the increment was in flight stay pending
+                    entry.count = count + entry.pending
+                    if expires_at is not None:
+                        entry.expires_at = min(entry.expires_at, expires_at)
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Rate limit sync error")
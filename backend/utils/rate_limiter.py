@@ -1,5 +1,43 @@
+import jwt
+from fastapi import Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from core.config import settings
+import utils.rate_limit_storage  # noqa: F401 (registers the sqlite:// and cached+ storage schemes)
 
-# Create limiter instance
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+
+def rate_limit_key(request: Request) -> str:
+    """
+    Rate limit signed-in users individually (so a classroom behind one NAT
+    does not share a limit) and everyone else by IP. Only the token's
+    signature is checked here; no database lookup.
+    """
+    token = request.cookies.get("access_token")
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if token:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except jwt.PyJWTError:
+            pass
+    return get_remote_address(request)
+
+
+def _storage_uri() -> str:
+    uri = settings.RATE_LIMIT_STORAGE_URI
+    if settings.RATE_LIMIT_SYNC_INTERVAL > 0 and not uri.startswith("memory://"):
+        return f"cached+{uri}"
+    return uri
+
+
+# Create limiter instance; counters live in shared storage so every worker enforces the same limits
+limiter = Limiter(
+    key_func=rate_limit_key,
+    storage_uri=_storage_uri(),
+    storage_options={"sync_interval": settings.RATE_LIMIT_SYNC_INTERVAL} if settings.RATE_LIMIT_SYNC_INTERVAL > 0 else {},
+    # Keep limiting per process if the shared store goes down
+    in_memory_fallback_enabled=not settings.RATE_LIMIT_STORAGE_URI.startswith("memory://"),
+)
@@ -1,7 +1,14 @@
-export interface CodeExecutionRequest {
+export interface ProjectFile {
+    path: string;
+    content: string;
+    encoding?: "utf-8" | "base64";
+  }
+
+  export interface CodeExecutionRequest {
     code: string;
     language: string;
     stdin?: string;
+    files?: ProjectFile[];
   }
   
   export interface CodeExecutionResponse {
@@ -10,6 +17,13 @@ export interface CodeExecutionRequest {
     exit_code: number;
     execution_time: number;
     error?: string;
+    timed_out?: boolean;
+    truncated?: boolean;
+    cached?: boolean;
+    oom_killed?: boolean;
+    cpu_time?: number | null;
+    peak_memory?: number | null;
+    overhead_time?: number | null;
   }
   
   export interface SupportedLanguagesResponse {